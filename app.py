@@ -1,90 +1,137 @@
 import json
+import threading
 
-from flask import Flask, jsonify
-from flask_restx import Resource, Api
-from sqlalchemy.exc import NoResultFound
-
-from models.api.data_models import (
-    LastKnownLocationDataModel,
-    LastKnownLocationResponseDataModel,
-    ClosestSatelliteDataModel,
-    ClosestSatelliteResponseDataModel,
-    InvalidTimestampFormatError,
-)
-from models.api.schemas.api_schemas import LAST_KNOWN_POS_SCHEMA, CLOSEST_SATELLITE_SCHEMA
-from scripts.rdbms_fetcher.fetch_data import RdbmsDataFetcher
+from flask import Flask, current_app, jsonify
 
 HTTP_OK = 200
 HTTP_NOT_FOUND = 404
 HTTP_BAD_REQUEST = 400
 
+FETCHER_EXTENSION = "rdbms_fetcher"
+_fetcher_lock = threading.Lock()
+
+
+def get_fetcher():
+    """
+    Returns the application's RdbmsDataFetcher, creating it on the first request.
+    SQLAlchemy, GeoAlchemy2 and the database engine are only loaded at that point.
+    """
+    fetcher = current_app.extensions.get(FETCHER_EXTENSION)
+    if fetcher is None:
+        with _fetcher_lock:
+            fetcher = current_app.extensions.get(FETCHER_EXTENSION)
+            if fetcher is None:
+                from scripts.rdbms_fetcher.fetch_data import RdbmsDataFetcher
+
+                fetcher = RdbmsDataFetcher(logger=current_app.logger)
+                current_app.extensions[FETCHER_EXTENSION] = fetcher
+    return fetcher
+
+
+def expected_exceptions() -> tuple:
+    """
+    Exceptions turned into a bad request, imported once the first request needs them.
+    """
+    from jsonschema import ValidationError
+    from sqlalchemy.exc import NoResultFound
+    from models.api.data_models import InvalidTimestampFormatError
+
+    return (ValidationError, InvalidTimestampFormatError, NoResultFound, ValueError)
+
+
+def create_app() -> Flask:
+    """
+    Application factory. Only the database configuration check, the API documentation and the precompiled
+    payload validators are built here; the data fetcher, its database engine and the Pydantic models
+    are loaded lazily by the first request.
+
+    Returns:
+        Flask: The configured Flask application.
+
+    Raises:
+        NecessaryParameterMissing: If a required database environment variable is missing or empty.
+    """
+    from flask_restx import Resource, Api
+    from jsonschema import Draft4Validator
+
+    from models.api.schemas.api_schemas import LAST_KNOWN_POS_SCHEMA, CLOSEST_SATELLITE_SCHEMA
+    from scripts.configuration.database import DatabaseConfigurationHelper
+
+    app = Flask(__name__)
+    # Fails fast on missing database environment variables; only reads them, the engine is still created lazily.
+    DatabaseConfigurationHelper(app.logger)
 
-app = Flask(__name__)
-api = Api(app, title="Starlink time series API", version="1.0", description="Blue Onion Labs case")
+    api = Api(app, title="Starlink time series API", version="1.0", description="Blue Onion Labs case")
 
-expected_exceptions = (InvalidTimestampFormatError, NoResultFound, ValueError)
+    last_known_position_model = api.schema_model("LastKnownPositionModel", LAST_KNOWN_POS_SCHEMA)
+    last_known_position_validator = Draft4Validator(LAST_KNOWN_POS_SCHEMA)
 
-fetcher = RdbmsDataFetcher(logger=app.logger)
-last_known_position_model = api.schema_model("LastKnownPositionModel", LAST_KNOWN_POS_SCHEMA)
+    @api.route("/last_known_location")
+    class LastKnownLocation(Resource):
+        @api.doc(description="Retrieves the last known location of a satellite object based on its ID and timestamp.")
+        @api.expect(last_known_position_model)
+        @api.response(HTTP_OK, "Last known location found.")
+        @api.response(HTTP_NOT_FOUND, "Not found")
+        @api.response(HTTP_BAD_REQUEST, "Invalid request.")
+        def post(self):
+            try:
+                payload = api.payload
+                last_known_position_validator.validate(payload)
 
+                from models.api.data_models import LastKnownLocationDataModel, LastKnownLocationResponseDataModel
 
-@api.route("/last_known_location")
-class LastKnownLocation(Resource):
-    @api.doc(description="Retrieves the last known location of a satellite object based on its ID and timestamp.")
-    @api.expect(last_known_position_model)
-    @api.response(HTTP_OK, "Last known location found.")
-    @api.response(HTTP_NOT_FOUND, "Not found")
-    @api.response(HTTP_BAD_REQUEST, "Invalid request.")
-    def post(self):
-        try:
-            payload = api.payload
-            validated_data = LastKnownLocationDataModel.model_validate(payload)
+                validated_data = LastKnownLocationDataModel.model_validate(payload)
 
-            location = fetcher.get_last_known_location(validated_data.object_id, validated_data.timestamp)
+                location = get_fetcher().get_last_known_location(validated_data.object_id, validated_data.timestamp)
 
-            validated_response = LastKnownLocationResponseDataModel.model_validate(location)
-            # Using model_dump_json ensures the conversion between datetime and a formatted string.
-            response_object = json.loads(validated_response.model_dump_json())
-            return jsonify(response_object)
+                validated_response = LastKnownLocationResponseDataModel.model_validate(location)
+                # Using model_dump_json ensures the conversion between datetime and a formatted string.
+                response_object = json.loads(validated_response.model_dump_json())
+                return jsonify(response_object)
 
-        except expected_exceptions as ex:
-            api.abort(HTTP_BAD_REQUEST, str(ex))
+            except expected_exceptions() as ex:
+                api.abort(HTTP_BAD_REQUEST, getattr(ex, "message", str(ex)))
 
-        except Exception as ex:
-            print(str(ex))
-            api.abort(HTTP_BAD_REQUEST, str(ex))
+            except Exception as ex:
+                print(str(ex))
+                api.abort(HTTP_BAD_REQUEST, str(ex))
 
+    closest_satellite_model = api.schema_model("ClosestSatelliteModel", CLOSEST_SATELLITE_SCHEMA)
+    closest_satellite_validator = Draft4Validator(CLOSEST_SATELLITE_SCHEMA)
 
-closest_satellite_model = api.schema_model("ClosestSatelliteModel", CLOSEST_SATELLITE_SCHEMA)
+    @api.route("/closest_satellite")
+    class ClosestSatellite(Resource):
+        @api.doc(description="Retrieves the closest satellite given a timestamp and a position.")
+        @api.expect(closest_satellite_model)
+        @api.response(HTTP_OK, "Closest Satellite found.")
+        @api.response(HTTP_NOT_FOUND, "Not found")
+        @api.response(HTTP_BAD_REQUEST, "Invalid request.")
+        def post(self):
+            try:
+                payload = api.payload
+                closest_satellite_validator.validate(payload)
 
+                from models.api.data_models import ClosestSatelliteDataModel, ClosestSatelliteResponseDataModel
+
+                validated_data = ClosestSatelliteDataModel.model_validate(payload)
 
-@api.route("/closest_satellite")
-class ClosestSatellite(Resource):
-    @api.doc(description="Retrieves the closest satellite given a timestamp and a position.")
-    @api.expect(closest_satellite_model)
-    @api.response(HTTP_OK, "Closest Satellite found.")
-    @api.response(HTTP_NOT_FOUND, "Not found")
-    @api.response(HTTP_BAD_REQUEST, "Invalid request.")
-    def post(self):
-        try:
-            payload = api.payload
-            validated_data = ClosestSatelliteDataModel.model_validate(payload)
+                closest_satellite = get_fetcher().get_closest_satellite(
+                    validated_data.timestamp, validated_data.latitude, validated_data.longitude
+                )
+                validated_response = ClosestSatelliteResponseDataModel.model_validate(closest_satellite)
+                # Using model_dump_json ensures the conversion between datetime and a formatted string.
+                response_object = json.loads(validated_response.model_dump_json())
+                return jsonify(response_object)
 
-            closest_satellite = fetcher.get_closest_satellite(
-                validated_data.timestamp, validated_data.latitude, validated_data.longitude
-            )
-            validated_response = ClosestSatelliteResponseDataModel.model_validate(closest_satellite)
-            # Using model_dump_json ensures the conversion between datetime and a formatted string.
-            response_object = json.loads(validated_response.model_dump_json())
-            return jsonify(response_object)
+            except expected_exceptions() as ex:
+                api.abort(HTTP_BAD_REQUEST, getattr(ex, "message", str(ex)))
 
-        except expected_exceptions as ex:
-            api.abort(HTTP_BAD_REQUEST, str(ex))
+            except Exception as ex:
+                print(str(ex))
+                api.abort(HTTP_BAD_REQUEST, str(ex))
 
-        except Exception as ex:
-            print(str(ex))
-            api.abort(HTTP_BAD_REQUEST, str(ex))
+    return app
 
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000)
+    create_app().run(host="0.0.0.0", port=5000)
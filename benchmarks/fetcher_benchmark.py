@@ -0,0 +1,171 @@
+"""
+Microbenchmark of the RdbmsDataFetcher hot paths.
+
+Compares the previous ORM implementation (session.query chains hydrating SatelliteLocations objects)
+with the pre-built Core statements, with and without server-side prepared statements,
+and checks that every path returns the same rows. Every path runs against the primary; read replicas are ignored.
+
+With --mock-dbapi, no server is needed: every query is answered with a fixed row by an in-memory DBAPI,
+so only the per-call Python overhead of each path is measured. Otherwise the configured database is queried.
+
+Usage:
+    python -m benchmarks.fetcher_benchmark <object_id> <timestamp> <latitude> <longitude> [iterations]
+    python -m benchmarks.fetcher_benchmark --mock-dbapi [iterations]
+"""
+
+import logging
+import os
+import sys
+import timeit
+from datetime import datetime
+from unittest.mock import patch
+
+from sqlalchemy.orm import Session
+from geoalchemy2.functions import ST_MakePoint, ST_SetSRID, ST_Distance
+
+from models.database.starlink_positions import SatelliteLocations
+from scripts.rdbms_fetcher.fetch_data import RdbmsDataFetcher
+from benchmarks.mock_dbapi import create_fixed_row_engine
+
+RESPONSE_KEYS = ("object_id", "creation_date", "latitude", "longitude")
+
+MOCK_DBAPI_ROW = {
+    "object_id": "2020-055AE",
+    "creation_date": datetime(2021, 1, 26, 6, 26, 10),
+    "location": None,
+    "latitude": 0.3,
+    "longitude": 10.0,
+    "is_lat_long_complete": True,
+}
+
+# Only read by the configuration helper: with --mock-dbapi, no connection is ever opened.
+MOCK_DBAPI_ENV_VARS = {
+    "POSTGRES_USER": "benchmark",
+    "POSTGRES_PASSWORD": "benchmark",
+    "POSTGRES_PORT": "5432",
+    "POSTGRES_DB": "benchmark",
+    "POSTGRES_HOST": "localhost",
+}
+
+
+def orm_last_known_location(engine, object_id: str, timestamp_as_str: str) -> dict:
+    with Session(bind=engine) as session:
+        return (
+            session.query(SatelliteLocations)
+            .filter(SatelliteLocations.object_id == object_id)
+            .filter(SatelliteLocations.creation_date <= timestamp_as_str)
+            .order_by(SatelliteLocations.creation_date.desc())
+            .first()
+            .to_dict()
+        )
+
+
+def orm_closest_satellite(engine, timestamp_as_str: str, latitude: float, longitude: float) -> dict:
+    with Session(bind=engine) as session:
+        point = ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)
+        return (
+            session.query(SatelliteLocations)
+            .filter(SatelliteLocations.creation_date == timestamp_as_str)
+            .order_by(ST_Distance(SatelliteLocations.location, point))
+            .first()
+            .to_dict()
+        )
+
+
+def response_fields(row: dict) -> tuple:
+    return tuple(row[key] for key in RESPONSE_KEYS)
+
+
+def build_fetchers(mock_dbapi: bool) -> tuple:
+    """
+    Builds a Core and a prepared statements fetcher, both bound to the primary,
+    or to a fixed row in-memory DBAPI with mock_dbapi.
+
+    Returns:
+        tuple: The Core fetcher, the prepared statements fetcher and the engine for the ORM path.
+    """
+    logging.basicConfig(format="%(message)s", level=logging.WARNING)
+    log = logging.getLogger()
+    # The snapshot would answer before the database, hiding the paths measured here.
+    os.environ.pop("POSITION_SNAPSHOT_PATH", None)
+    # Every path must hit the same server: without replicas, the fetchers' router always uses the primary.
+    os.environ.pop("POSTGRES_REPLICA_HOSTS", None)
+    if mock_dbapi:
+        os.environ.update(MOCK_DBAPI_ENV_VARS)
+
+    fetchers = []
+    for use_prepared_statements in (False, True):
+        fetcher = RdbmsDataFetcher(log, use_prepared_statements=use_prepared_statements)
+        fetcher.logger.setLevel(logging.WARNING)
+        if mock_dbapi:
+            with patch(
+                "scripts.rdbms_fetcher.fetch_data.create_engine",
+                lambda *args, **kwargs: create_fixed_row_engine(MOCK_DBAPI_ROW, RESPONSE_KEYS),
+            ):
+                fetcher.engine
+        fetchers.append(fetcher)
+
+    core_fetcher, prepared_fetcher = fetchers
+    return core_fetcher, prepared_fetcher, core_fetcher.engine
+
+
+def main(
+    object_id: str, timestamp_as_str: str, latitude: float, longitude: float, iterations: int, mock_dbapi: bool = False
+) -> dict:
+    """
+    Checks that every path returns the same rows, then times them.
+
+    Returns:
+        dict: Seconds per call, by query and path.
+    """
+    core_fetcher, prepared_fetcher, engine = build_fetchers(mock_dbapi)
+
+    paths = {
+        "last_known_location": {
+            "orm": lambda: orm_last_known_location(engine, object_id, timestamp_as_str),
+            "core": lambda: core_fetcher.get_last_known_location(object_id, timestamp_as_str),
+            "prepared": lambda: prepared_fetcher.get_last_known_location(object_id, timestamp_as_str),
+        },
+        "closest_satellite": {
+            "orm": lambda: orm_closest_satellite(engine, timestamp_as_str, latitude, longitude),
+            "core": lambda: core_fetcher.get_closest_satellite(timestamp_as_str, latitude, longitude),
+            "prepared": lambda: prepared_fetcher.get_closest_satellite(timestamp_as_str, latitude, longitude),
+        },
+    }
+
+    timings = {}
+    for query, implementations in paths.items():
+        results = {name: response_fields(implementation()) for name, implementation in implementations.items()}
+        if len(set(results.values())) != 1:
+            raise AssertionError(f"{query} results differ between implementations: {results}")
+
+        timings[query] = {}
+        for name, implementation in implementations.items():
+            seconds = min(timeit.repeat(implementation, number=iterations, repeat=3)) / iterations
+            timings[query][name] = seconds
+            orm_seconds = timings[query]["orm"]
+            print(f"{query:<20} {name:<9} {seconds * 1e6:10.1f} us/call  {orm_seconds / seconds:5.2f}x vs orm")
+    return timings
+
+
+if __name__ == "__main__":
+    if len(sys.argv) in (2, 3) and sys.argv[1] == "--mock-dbapi":
+        main(
+            MOCK_DBAPI_ROW["object_id"],
+            MOCK_DBAPI_ROW["creation_date"].isoformat(),
+            MOCK_DBAPI_ROW["latitude"],
+            MOCK_DBAPI_ROW["longitude"],
+            int(sys.argv[2]) if len(sys.argv) == 3 else 2000,
+            mock_dbapi=True,
+        )
+    elif len(sys.argv) in (5, 6):
+        main(
+            sys.argv[1],
+            sys.argv[2],
+            float(sys.argv[3]),
+            float(sys.argv[4]),
+            int(sys.argv[5]) if len(sys.argv) == 6 else 500,
+        )
+    else:
+        print(__doc__)
+        sys.exit(1)
@@ -0,0 +1,134 @@
+"""
+In-memory DBAPI answering every query with fixed rows, so the fetcher benchmark can measure the Python overhead
+of each query path without a Postgres server.
+
+The engine uses the psycopg2 dialect, so SQL compilation, parameter binding and result processing are the ones
+the API runs; only the network round trip and the server's work are left out.
+"""
+
+import re
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import registry
+from sqlalchemy.dialects.postgresql.psycopg2 import PGDialect_psycopg2
+from sqlalchemy.engine import Engine
+
+# Postgres type OIDs of the fixed row columns, as psycopg2 reports them in cursor.description.
+FLOAT8_OID = 701
+TEXT_OID = 25
+
+# Answers to the queries run by the dialect on the first connection.
+DIALECT_INITIALIZATION_QUERIES = {
+    "select pg_catalog.version()": "PostgreSQL 15.4 on x86_64-pc-linux-gnu",
+    "select current_schema()": "public",
+    "show transaction isolation level": "read committed",
+    "show standard_conforming_strings": "on",
+}
+
+SELECT_LIST = re.compile(r"SELECT (.*?)\s+FROM ", re.DOTALL)
+
+
+class MockDbapiDialect(PGDialect_psycopg2):
+    """
+    psycopg2 dialect whose connect hook is skipped, since it registers psycopg2 adapters on a real connection.
+    """
+
+    supports_statement_cache = True
+
+    def on_connect(self):
+        return None
+
+
+registry.register("postgresql.mockdbapi", "benchmarks.mock_dbapi", "MockDbapiDialect")
+
+
+class MockCursor:
+    """
+    DBAPI cursor returning the fixed row's values for the columns of each SELECT, in the order they are selected.
+    Columns are matched by name suffix, so both Core (object_id) and ORM (satellite_locations_object_id) labels work.
+    Prepared statements are answered with the prepared_columns of the fixed row.
+    """
+
+    def __init__(self, connection) -> None:
+        self.connection = connection
+        self.description = None
+        self.rowcount = -1
+        self.__rows = []
+
+    def execute(self, statement: str, parameters=None) -> None:
+        self.description = None
+        self.__rows = []
+        if statement in DIALECT_INITIALIZATION_QUERIES:
+            self.__answer(["result"], [DIALECT_INITIALIZATION_QUERIES[statement]])
+        elif statement.startswith("EXECUTE "):
+            columns = list(self.connection.prepared_columns)
+            self.__answer(columns, [self.connection.row[column] for column in columns])
+        elif statement.startswith("SELECT "):
+            labels = [label.split(" AS ")[-1].split(".")[-1] for label in SELECT_LIST.match(statement)[1].split(", ")]
+            columns = [next(column for column in self.connection.row if label.endswith(column)) for label in labels]
+            self.__answer(columns, [self.connection.row[column] for column in columns])
+
+    def __answer(self, columns: list[str], values: list) -> None:
+        self.description = [
+            (column, FLOAT8_OID if isinstance(value, float) else TEXT_OID, None, None, None, None, None)
+            for column, value in zip(columns, values)
+        ]
+        self.__rows = [tuple(values)]
+        self.rowcount = 1
+
+    def fetchone(self):
+        return self.__rows.pop(0) if self.__rows else None
+
+    def fetchall(self) -> list:
+        rows, self.__rows = self.__rows, []
+        return rows
+
+    def fetchmany(self, size=None) -> list:
+        return self.fetchall()
+
+    def close(self) -> None:
+        pass
+
+
+class MockConnection:
+    """
+    DBAPI connection handing out MockCursors. Transactions are no-ops.
+    """
+
+    autocommit = False
+    notices = []
+    status = 1  # psycopg2.extensions.STATUS_READY
+
+    def __init__(self, row: dict, prepared_columns: tuple) -> None:
+        self.row = row
+        self.prepared_columns = prepared_columns
+
+    def cursor(self, *args, **kwargs) -> MockCursor:
+        return MockCursor(self)
+
+    def commit(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def create_fixed_row_engine(row: dict, prepared_columns: tuple) -> Engine:
+    """
+    Creates an engine whose connections answer every query with the given row.
+
+    Parameters:
+        row (dict): Value of every column that can be selected, by column name.
+        prepared_columns (tuple): Columns returned by EXECUTE of a server-side prepared statement.
+
+    Returns:
+        Engine: The SQLAlchemy engine.
+    """
+    return create_engine(
+        "postgresql+mockdbapi://",
+        creator=lambda: MockConnection(row, prepared_columns),
+        use_native_hstore=False,
+    )
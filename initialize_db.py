@@ -2,8 +2,10 @@ import logging
 
 from sqlalchemy import create_engine
 
-from scripts.configuration.database import DatabaseConfigurationHelper
+from scripts.configuration.database import DatabaseConfigurationHelper, load_optional_env
 from scripts.importer.import_data import JsonToRdbmsDataImporter
+from scripts.rdbms_fetcher.replica_router import ReplicaRouter
+from scripts.snapshot.position_snapshot import PositionSnapshotWriter
 from models.database.starlink_positions import SatelliteLocations, Base
 from models.json_input.satellite_position import SatelliteData
 
@@ -21,6 +23,26 @@ Base.metadata.create_all(engine)
 
 ## Ingest data
 importer = JsonToRdbmsDataImporter(log, engine)
-satellite_position_objects = importer.import_json_data_into_table(
-    data_file_path="data/starlink_historical_data.json", table=SatelliteLocations, model=SatelliteData
+import_counts = importer.import_json_data_into_table(
+    data_file_path="data/starlink_historical_data.json",
+    table=SatelliteLocations,
+    model=SatelliteData,
+    deduplication_key=SatelliteData.primary_key_from_element,
 )
+
+## Make sure reads routed to the replicas see the imported data
+replica_engines = [
+    create_engine(uri, echo=False, connect_args={"connect_timeout": config.replica_connect_timeout_seconds})
+    for uri in config.replica_database_uris
+]
+if replica_engines:
+    router = ReplicaRouter(log, engine, replica_engines)
+    import_lsn = router.fetch_primary_wal_lsn()
+    if router.wait_for_replication(import_lsn):
+        log.info(f"Read replicas replayed the import up to {import_lsn}.")
+    log.info(f"Replication lag by replica: {router.replication_lags()}")
+
+## Publish the position snapshot shared by the API workers
+snapshot_path = load_optional_env("POSITION_SNAPSHOT_PATH")
+if snapshot_path is not None:
+    PositionSnapshotWriter(log).build_from_engine(engine, snapshot_path)
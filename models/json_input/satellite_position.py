@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Optional
 
 from pydantic import BaseModel, Field, computed_field, validator
@@ -17,6 +18,9 @@ class SpaceTrack(BaseModel):
 
     Class Config:
         populate_by_name (bool): Configuration to allow Pydantic to enable our aliasing strategy.
+
+    Methods:
+        validate_creation_date: Validates the creation date format (YYYY-MM-DDTHH:MM:SS), without timezone offset.
     """
 
     object_id: str = Field(..., alias="OBJECT_ID")
@@ -25,6 +29,14 @@ class SpaceTrack(BaseModel):
     class Config:
         populate_by_name = True
 
+    @validator("creation_date")
+    def validate_creation_date(cls, value):
+        try:
+            datetime.strptime(value, "%Y-%m-%dT%H:%M:%S")
+        except ValueError:
+            raise ValueError("Creation date must be in ISO format (YYYY-MM-DDTHH:MM:SS).")
+        return value
+
 
 class SatelliteData(BaseModel):
     """
@@ -40,6 +52,7 @@ class SatelliteData(BaseModel):
 
     Methods:
         dict: Converts the SatelliteData instance into a dictionary format, including computed fields.
+        primary_key_from_element: Extracts the (object_id, creation_date) key from a raw, unvalidated element.
         is_lat_long_complete: A property indicating whether both latitude and longitude are provided.
         location: A property that instantiates a Point object from latitude and longitude.
         validate_latitude: Validates the latitude value to ensure it's within the valid range or null.
@@ -63,6 +76,25 @@ class SatelliteData(BaseModel):
             "is_lat_long_complete": self.is_lat_long_complete,
         }
 
+    @staticmethod
+    def primary_key_from_element(element: dict) -> Optional[tuple]:
+        """
+        Extracts the primary key from a raw element, before any validation.
+        Used by the importer to drop duplicates without paying for their validation.
+
+        Returns:
+            Optional[tuple]: (OBJECT_ID, CREATION_DATE) of the element. None if the element is malformed,
+                including non-string values, so validation rejects it rather than the key failing to hash.
+        """
+        space_track = element.get("spaceTrack") if isinstance(element, dict) else None
+        if not isinstance(space_track, dict):
+            return None
+        object_id = space_track.get("OBJECT_ID")
+        creation_date = space_track.get("CREATION_DATE")
+        if not isinstance(object_id, str) or not isinstance(creation_date, str):
+            return None
+        return object_id, creation_date
+
     @computed_field
     @property
     def is_lat_long_complete(self) -> bool:
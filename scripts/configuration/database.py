@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 
 
 def load_required_env(env_name: str) -> str:
@@ -11,15 +12,31 @@ def load_required_env(env_name: str) -> str:
     return os.environ[env_name]
 
 
+def load_optional_env(env_name: str, default: Optional[str] = None) -> Optional[str]:
+    """
+    Loads an optional environment variable.
+    Returns the default in case the variable is missing or empty
+    """
+    if env_name not in os.environ or os.environ[env_name] == "":
+        return default
+    return os.environ[env_name]
+
+
 class DatabaseConfigurationHelper:
     """
     A helper class for fetching and constructing database configuration details from environment variables.
 
     This class reads database configuration parameters such as username, password, host, port, and database name
     from the environment variables and provides an assembled database URI.
+    POSTGRES_HOST is the primary, which receives every write. Read replicas sharing the same credentials and
+    database name can be listed in POSTGRES_REPLICA_HOSTS, as comma separated host or host:port entries.
 
     Attributes:
         logger (Logger): A logging object used to log messages.
+        replica_max_lag_seconds (Optional[float]): Replicas lagging further behind the primary are not routed to.
+            Read from POSTGRES_REPLICA_MAX_LAG_SECONDS, unbounded when unset.
+        replica_connect_timeout_seconds (int): Connection timeout of the read replicas, so an unreachable replica
+            does not stall requests. Read from POSTGRES_REPLICA_CONNECT_TIMEOUT_SECONDS, 2 seconds when unset.
 
     Raises:
         NecessaryParameterMissing: If a required environment variable is missing or empty.
@@ -28,6 +45,7 @@ class DatabaseConfigurationHelper:
         logger = logging.getLogger()
         config_helper = DatabaseConfigurationHelper(logger)
         db_uri = config_helper.database_uri
+        replica_uris = config_helper.replica_database_uris
     """
 
     class NecessaryParameterMissing(Exception):
@@ -49,10 +67,30 @@ class DatabaseConfigurationHelper:
         self.__db_port = load_required_env("POSTGRES_PORT")
         self.__db_name = load_required_env("POSTGRES_DB")
         self.__db_host = load_required_env("POSTGRES_HOST")
+        self.__db_replica_hosts = [
+            host.strip() for host in load_optional_env("POSTGRES_REPLICA_HOSTS", "").split(",") if host.strip()
+        ]
+        replica_max_lag_seconds = load_optional_env("POSTGRES_REPLICA_MAX_LAG_SECONDS")
+        self.replica_max_lag_seconds = None if replica_max_lag_seconds is None else float(replica_max_lag_seconds)
+        self.replica_connect_timeout_seconds = int(load_optional_env("POSTGRES_REPLICA_CONNECT_TIMEOUT_SECONDS", "2"))
+
+    def __build_uri(self, host: str, port: str) -> str:
+        return f"postgresql+psycopg2://{self.__db_username}:{self.__db_password}@{host}:{port}/{self.__db_name}"
 
     @property
     def database_uri(self) -> str:
         """
-        Database URI to be used in SQLAlchemy.
+        Database URI of the primary, to be used in SQLAlchemy.
+        """
+        return self.__build_uri(self.__db_host, self.__db_port)
+
+    @property
+    def replica_database_uris(self) -> list[str]:
+        """
+        Database URIs of the read replicas, to be used in SQLAlchemy. Empty when no replica is configured.
         """
-        return f"postgresql+psycopg2://{self.__db_username}:{self.__db_password}@{self.__db_host}:{self.__db_port}/{self.__db_name}"
+        uris = []
+        for replica_host in self.__db_replica_hosts:
+            host, _, port = replica_host.partition(":")
+            uris.append(self.__build_uri(host, port or self.__db_port))
+        return uris
@@ -0,0 +1,47 @@
+from collections import deque
+from typing import Hashable
+
+
+class DeduplicationWindow:
+    """
+    Bounded-memory set of the most recently seen record keys, used to drop duplicates before they reach the database.
+
+    Once max_keys keys are held, the oldest key is forgotten for every new one, so duplicates further apart
+    than the window are left to the database's ON CONFLICT DO NOTHING.
+    A max_keys of 0 disables deduplication.
+
+    Attributes:
+        max_keys (int): Maximum number of keys held at once.
+
+    Methods:
+        __contains__: Whether a key was seen within the window.
+        add: Records a key as seen.
+    """
+
+    def __init__(self, max_keys: int) -> None:
+        self.max_keys = max_keys
+        self.__keys = set()
+        self.__insertion_order = deque()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.__keys
+
+    def __len__(self) -> int:
+        return len(self.__keys)
+
+    def add(self, key: Hashable) -> None:
+        """
+        Records a key as seen, evicting the oldest one when the window is full.
+
+        Parameters:
+            key (Hashable): The record key, e.g. its primary key values.
+
+        Returns:
+            None
+        """
+        if self.max_keys <= 0 or key in self.__keys:
+            return
+        if len(self.__keys) >= self.max_keys:
+            self.__keys.discard(self.__insertion_order.popleft())
+        self.__keys.add(key)
+        self.__insertion_order.append(key)
@@ -1,12 +1,19 @@
-from typing import Type
+from typing import Callable, Hashable, Optional, Type
 
 import ijson
+from sqlalchemy import text
+from sqlalchemy.exc import DataError, IntegrityError
 from sqlalchemy.orm import Session
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.inspection import inspect
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 
 from models.database.starlink_positions import Base
+from scripts.importer.deduplication import DeduplicationWindow
+from scripts.importer.quarantine import QuarantineFile
+
+# Errors caused by the values of a row. Connection errors are not part of it: they must abort the import.
+ROW_DATA_ERRORS = (DataError, IntegrityError)
 
 
 class JsonToRdbmsDataImporter:
@@ -14,28 +21,50 @@ class JsonToRdbmsDataImporter:
     This class is responsible for importing JSON data into a relational database management system (RDBMS).
     It reads JSON data from a file, converts it into model objects,
     and then inserts the data into a specified database table in batches.
+    Writes must go to the primary database: importing through a read replica is refused.
+
+    Records are deduplicated in-stream before reaching the database, and records failing validation are written
+    to a quarantine file with the reason instead of aborting the import. A batch the database rejects is retried
+    row by row, quarantining only the rows that fail.
 
     Inputs:
         logger (Logger): A logging object for capturing the activities of the data importer.
         engine (Engine): A SQLAlchemy engine object for database connection and operations.
         batch_size (int): The number of records to be inserted in a single batch.
+        deduplication_window_size (int): The number of most recent record keys remembered to drop duplicates.
+            0 disables the in-stream deduplication, leaving it to ON CONFLICT DO NOTHING.
 
     Methods:
         import_json_data_into_table: Parses JSON data and handles the batch inserts.
+        __insert_batch: Inserts a batch, falling back to row by row inserts when the database rejects it.
         __insert_data_to_rdbms: Performs the actual insertion of data into the RDBMS.
+        __assert_primary_database: Ensures the engine does not point to a read replica.
         __instantiate_model_object: Instantiates a Pydantic model object from a dictionary.
         __fetch_table_primary_key: Retrieves the primary key(s) of a given table.
 
     """
 
-    def __init__(self, logger, engine, batch_size=300) -> None:
+    class ReadReplicaEngine(Exception):
+        def __init__(self):
+            self.message = "Import aborted. The engine points to a read replica, data must be written to the primary."
+            super().__init__(self.message)
+
+    def __init__(self, logger, engine, batch_size=300, deduplication_window_size=100000) -> None:
         self.logger = logger
         self.engine = engine
         self.batch_size = batch_size
+        self.deduplication_window_size = deduplication_window_size
 
         self.session = Session(bind=self.engine)
 
-    def import_json_data_into_table(self, data_file_path: str, table: Type[Base], model: BaseModel) -> None:
+    def import_json_data_into_table(
+        self,
+        data_file_path: str,
+        table: Type[Base],
+        model: BaseModel,
+        deduplication_key: Optional[Callable[[dict], Optional[Hashable]]] = None,
+        quarantine_file_path: Optional[str] = None,
+    ) -> dict:
         """
         Parses JSON data from a file using Pydantic models and handles the batched
         insertion into a specified database table.
@@ -44,31 +73,129 @@ class JsonToRdbmsDataImporter:
             data_file_path (str): The file path of the JSON data file.
             table (Type[Base]): The SQLAlchemy table class into which data will be inserted.
             model (BaseModel): The Pydantic model that represents the structure of the data.
+            deduplication_key (Optional[Callable]): Extracts the primary key from a raw element, so duplicates are
+                dropped before validation. Defaults to the table's primary key values of the validated record.
+            quarantine_file_path (Optional[str]): Where rejected records go. Defaults to
+                <data_file_path>.quarantine.jsonl, only created if a record is rejected.
 
         Returns:
-            None
+            dict: The number of total, inserted, duplicate and rejected records. Inserted records are the rows the
+                database actually wrote, so records already in the table are not counted.
         """
+        self.__assert_primary_database()
+
+        primary_keys = self.__fetch_table_primary_key(table)
+        seen_keys = DeduplicationWindow(self.deduplication_window_size)
+        quarantine_file_path = quarantine_file_path or f"{data_file_path}.quarantine.jsonl"
+
         self.logger.info(f"Beginning to parse {data_file_path} json elements.")
-        with open(data_file_path, "r") as json_file:
+        with open(data_file_path, "r") as json_file, QuarantineFile(quarantine_file_path) as quarantine:
             json_content = ijson.items(json_file, "item")
 
             values_to_insert = []
+            elements_to_insert = []
             total_records = 0
+            inserted_records = 0
+            duplicate_records = 0
             for element in json_content:
-                satellite_obj = self.__instantiate_model_object(model, element)
-                values_to_insert.append(satellite_obj.dict())
-
                 total_records += 1
 
+                key = deduplication_key(element) if deduplication_key is not None else None
+                if key is not None and key in seen_keys:
+                    duplicate_records += 1
+                    continue
+
+                try:
+                    satellite_obj = self.__instantiate_model_object(model, element)
+                except ValidationError as ex:
+                    quarantine.write(element, str(ex))
+                    continue
+
+                record = satellite_obj.dict()
+                if deduplication_key is None:
+                    key = tuple(record[primary_key] for primary_key in primary_keys)
+                    if key in seen_keys:
+                        duplicate_records += 1
+                        continue
+                if key is not None:
+                    seen_keys.add(key)
+
+                values_to_insert.append(record)
+                elements_to_insert.append(element)
+
                 if len(values_to_insert) >= self.batch_size:
                     self.logger.info(f"inserting, {len(values_to_insert)} records, index {total_records}")
-                    self.__insert_data_to_rdbms(table, values_to_insert)
+                    inserted_records += self.__insert_batch(table, values_to_insert, elements_to_insert, quarantine)
                     values_to_insert = []
+                    elements_to_insert = []
+
+            if values_to_insert:
+                self.logger.info(f"inserting remaining {len(values_to_insert)} records, total of {total_records}.")
+                inserted_records += self.__insert_batch(table, values_to_insert, elements_to_insert, quarantine)
+
+        import_counts = {
+            "total_records": total_records,
+            "inserted_records": inserted_records,
+            "duplicate_records": duplicate_records,
+            "rejected_records": quarantine.quarantined_records,
+        }
+        self.logger.info(
+            f"Import of {data_file_path} finished: {inserted_records} records inserted, "
+            f"{duplicate_records} duplicates dropped, {quarantine.quarantined_records} rejected."
+        )
+        if quarantine.quarantined_records:
+            self.logger.warning(f"Rejected records were written to {quarantine_file_path}.")
+        return import_counts
+
+    def __assert_primary_database(self) -> None:
+        """
+        Raises ReadReplicaEngine when the engine's server is a replica (still in recovery).
 
-            self.logger.info(f"inserted remaining {len(values_to_insert)} records, total of {total_records} records.")
-            self.__insert_data_to_rdbms(table, values_to_insert)
+        Returns:
+            None
+        """
+        with self.engine.connect() as connection:
+            is_in_recovery = connection.execute(text("SELECT pg_is_in_recovery()")).scalar()
+        if is_in_recovery is True:
+            raise JsonToRdbmsDataImporter.ReadReplicaEngine()
+
+    def __insert_batch(
+        self,
+        table: Type[Base],
+        values_to_insert: list[dict],
+        elements_to_insert: list[dict],
+        quarantine: QuarantineFile,
+    ) -> int:
+        """
+        Inserts a batch of records. If the database rejects the batch's data, it is rolled back and retried
+        row by row, and the raw elements of the rows that still fail are quarantined.
+        Any other database error, such as a lost connection, is raised.
+
+        Parameters:
+            table (Type[Base]): The SQLAlchemy table class into which data will be inserted.
+            values_to_insert (list[dict]): The validated records to be inserted.
+            elements_to_insert (list[dict]): The raw elements the records were built from, in the same order.
+            quarantine (QuarantineFile): Where the rows rejected by the database are written.
 
-    def __insert_data_to_rdbms(self, table: Type[Base], values_to_insert: list[dict]) -> None:
+        Returns:
+            int: The number of rows inserted.
+        """
+        try:
+            return self.__insert_data_to_rdbms(table, values_to_insert)
+        except ROW_DATA_ERRORS as ex:
+            self.session.rollback()
+            self.logger.warning(f"Batch of {len(values_to_insert)} records rejected, retrying row by row: {ex}")
+
+        inserted_records = 0
+        for record, element in zip(values_to_insert, elements_to_insert):
+            try:
+                inserted_records += self.__insert_data_to_rdbms(table, [record])
+            except ROW_DATA_ERRORS as ex:
+                self.session.rollback()
+                quarantine.write(element, str(ex))
+        return inserted_records
+
+    def __insert_data_to_rdbms(self, table: Type[Base], values_to_insert: list[dict]) -> int:
         """
         Inserts a list of dictionary values into the specified table in the database.
         It also fetches the primary key to be able to use the ON CONFICT DO NOTHING statement.
@@ -78,14 +205,15 @@ class JsonToRdbmsDataImporter:
             values_to_insert (list[dict]): A list of dictionaries representing the records to be inserted.
 
         Returns:
-            None
+            int: The number of rows inserted, not counting the ones skipped by ON CONFLICT DO NOTHING.
         """
         primary_keys = self.__fetch_table_primary_key(table)
 
         insert_stmt = insert(table).values(values_to_insert)
         conflict_stmt = insert_stmt.on_conflict_do_nothing(index_elements=primary_keys)
-        self.session.execute(conflict_stmt)
+        result = self.session.execute(conflict_stmt)
         self.session.commit()
+        return result.rowcount
 
     def __instantiate_model_object(self, model: BaseModel, element: dict) -> BaseModel:
         """
@@ -0,0 +1,60 @@
+import json
+import os
+from decimal import Decimal
+
+
+def _to_json_compatible(value):
+    # ijson parses numbers as Decimal, which the json module does not serialize.
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+class QuarantineFile:
+    """
+    JSON lines file collecting the records rejected during an import, along with the reason of each rejection.
+    Any quarantine file left by a previous run is removed when this one is opened,
+    and the new file is only created once the first record is quarantined.
+
+    Attributes:
+        file_path (str): The file path of the quarantine file.
+        quarantined_records (int): Number of records written so far.
+
+    Methods:
+        write: Appends a rejected record and its reason.
+        close: Closes the file, if it was created.
+    """
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+        self.quarantined_records = 0
+        self.__file = None
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def write(self, record: dict, reason: str) -> None:
+        """
+        Appends a rejected record and the reason it was rejected.
+
+        Parameters:
+            record (dict): The raw record, as parsed from the input file.
+            reason (str): Why the record was rejected.
+
+        Returns:
+            None
+        """
+        if self.__file is None:
+            self.__file = open(self.file_path, "w")
+        self.__file.write(json.dumps({"reason": reason, "record": record}, default=_to_json_compatible) + "\n")
+        self.quarantined_records += 1
+
+    def close(self) -> None:
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
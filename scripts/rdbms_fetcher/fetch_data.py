@@ -1,35 +1,220 @@
 import logging
+import os
+import threading
+from datetime import datetime
+from typing import Optional
 
-from sqlalchemy.orm import Session
-from sqlalchemy import create_engine
+from sqlalchemy import Float, bindparam, create_engine, event, literal_column, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Engine
 from sqlalchemy.exc import NoResultFound
+from sqlalchemy.sql import Select
 from geoalchemy2.functions import ST_MakePoint, ST_SetSRID, ST_Distance
 
-from scripts.configuration.database import DatabaseConfigurationHelper
+from scripts.configuration.database import DatabaseConfigurationHelper, load_optional_env
+from scripts.rdbms_fetcher.replica_router import ReplicaRouter
+from scripts.snapshot.position_snapshot import PositionSnapshot
 from models.database.starlink_positions import SatelliteLocations
 
+# Only the columns needed by the API responses are read, as plain rows instead of ORM objects.
+RESPONSE_COLUMNS = (
+    SatelliteLocations.object_id,
+    SatelliteLocations.creation_date,
+    SatelliteLocations.latitude,
+    SatelliteLocations.longitude,
+)
+
+# Statements are built once; SQLAlchemy caches their compiled form and only binds new parameters per call.
+LAST_KNOWN_LOCATION_STATEMENT = (
+    select(*RESPONSE_COLUMNS)
+    .where(SatelliteLocations.object_id == bindparam("object_id"))
+    .where(SatelliteLocations.creation_date <= bindparam("timestamp"))
+    .order_by(SatelliteLocations.creation_date.desc())
+    .limit(1)
+)
+
+# geoalchemy2 types are not cache_ok, so any statement holding one would be recompiled on every call.
+# The location column and the PostGIS functions are therefore referenced with plain types; the SQL is unchanged.
+LOCATION_COLUMN = literal_column(f"{SatelliteLocations.__tablename__}.{SatelliteLocations.location.name}")
+
+CLOSEST_SATELLITE_STATEMENT = (
+    select(*RESPONSE_COLUMNS)
+    .where(SatelliteLocations.creation_date == bindparam("timestamp"))
+    .order_by(
+        ST_Distance(
+            LOCATION_COLUMN,
+            ST_SetSRID(
+                ST_MakePoint(bindparam("longitude", type_=Float), bindparam("latitude", type_=Float), type_=Float),
+                4326,
+                type_=Float,
+            ),
+            type_=Float,
+        )
+    )
+    .limit(1)
+)
+
+PREPARED_STATEMENTS = {
+    "last_known_location": LAST_KNOWN_LOCATION_STATEMENT,
+    "closest_satellite": CLOSEST_SATELLITE_STATEMENT,
+}
+
 
 class RdbmsDataFetcher:
     """
-    Manages the ORM interaction between the API routes and our Postgresql (in this case) database.
-    Can also be used with different RDBMS engines.
+    Manages the interaction between the API routes and our Postgresql (in this case) database,
+    through pre-built SQLAlchemy Core statements.
+    Can also be used with different RDBMS engines, as long as prepared statements stay disabled.
 
     Attributes:
         logger (Logger): A logging object for capturing the activities of the data fetcher.
         cfg (DatabaseConfigurationHelper): A helper object for database configuration.
-        engine (Engine): A SQLAlchemy engine object for database connection and operations.
+        engine (Engine): A SQLAlchemy engine object connected to the primary database.
+            Created on first use, so constructing the fetcher does not touch the database.
+        router (ReplicaRouter): Routes queries to the configured read replicas, falling back to the primary.
+        snapshot_path (Optional[str]): Memory-mapped position snapshot answering queries before the database.
+            Defaults to the POSITION_SNAPSHOT_PATH environment variable. Misses fall back to the database.
+        use_prepared_statements (bool): Experimental, not yet verified against Postgres. Whether to PREPARE the
+            statements server-side on every new connection. Defaults to the
+            POSTGRES_EXPERIMENTAL_PREPARED_STATEMENTS environment variable being "true".
 
     Methods:
         get_last_known_location: Retrieves the last recorded position of a specified object up to a certain timestamp.
         get_closest_satellite: Finds the nearest satellite to a given latitude and longitude at a specific timestamp.
+        get_replication_lag: Reports how far behind the primary each read replica is.
 
     """
 
-    def __init__(self, logger) -> None:
+    def __init__(
+        self, logger, snapshot_path: Optional[str] = None, use_prepared_statements: Optional[bool] = None
+    ) -> None:
         self.logger = logger.getChild("RdbmsDataFetcher")
         self.logger.setLevel(logging.INFO)
         self.cfg = DatabaseConfigurationHelper(logger)
-        self.engine = create_engine(self.cfg.database_uri, echo=False)
+        self.snapshot_path = snapshot_path or load_optional_env("POSITION_SNAPSHOT_PATH")
+        if use_prepared_statements is None:
+            use_prepared_statements = (
+                load_optional_env("POSTGRES_EXPERIMENTAL_PREPARED_STATEMENTS", "false").lower() == "true"
+            )
+        self.use_prepared_statements = use_prepared_statements
+        if self.use_prepared_statements:
+            self.logger.warning("Server-side prepared statements are experimental and not verified against Postgres.")
+        self.__engine = None
+        self.__engine_lock = threading.Lock()
+        self.__router = None
+        self.__router_lock = threading.Lock()
+        self.__snapshot = None
+        self.__snapshot_lock = threading.Lock()
+        self.__prepared_statements = {}
+
+    @property
+    def engine(self) -> Engine:
+        """
+        SQLAlchemy engine, lazily created from the database configuration.
+        Concurrent first requests share a single engine.
+        """
+        if self.__engine is None:
+            with self.__engine_lock:
+                if self.__engine is None:
+                    if self.use_prepared_statements:
+                        self.__prepared_statements = compile_prepared_statements(PREPARED_STATEMENTS)
+                    self.__engine = self.__create_engine(self.cfg.database_uri)
+        return self.__engine
+
+    @property
+    def router(self) -> ReplicaRouter:
+        """
+        Replica router, lazily created along with one engine per configured read replica.
+        Its health checks run in a background thread, off the request path.
+        Concurrent first requests share a single router, so a single health check thread is started.
+        """
+        if self.__router is None:
+            with self.__router_lock:
+                if self.__router is None:
+                    replica_connect_args = {"connect_timeout": self.cfg.replica_connect_timeout_seconds}
+                    router = ReplicaRouter(
+                        self.logger,
+                        self.engine,
+                        [self.__create_engine(uri, replica_connect_args) for uri in self.cfg.replica_database_uris],
+                        max_replication_lag_seconds=self.cfg.replica_max_lag_seconds,
+                    )
+                    router.start_health_checks()
+                    self.__router = router
+        return self.__router
+
+    def __create_engine(self, database_uri: str, connect_args: Optional[dict] = None) -> Engine:
+        engine = create_engine(database_uri, echo=False, connect_args=connect_args or {})
+        if self.use_prepared_statements:
+            event.listen(engine, "connect", self.__prepare_statements)
+        return engine
+
+    def __prepare_statements(self, dbapi_connection, connection_record) -> None:
+        """
+        Prepares every statement server-side once per new DBAPI connection.
+        """
+        cursor = dbapi_connection.cursor()
+        for name, compiled in self.__prepared_statements.items():
+            cursor.execute(f"PREPARE {name} AS {compiled}")
+        cursor.close()
+
+    def __fetch_first_row(self, name: str, parameters: dict) -> Optional[dict]:
+        """
+        Runs one of the PREPARED_STATEMENTS with the given parameters, either through its cached Core
+        statement or through EXECUTE of its server-side prepared version.
+
+        Parameters:
+            name (str): Name of the statement in PREPARED_STATEMENTS.
+            parameters (dict): Values of the statement's bound parameters.
+
+        Returns:
+            Optional[dict]: The first row as a dictionary of the response columns, or None when there is no row.
+        """
+        with self.router.connect() as connection:
+            if self.use_prepared_statements:
+                compiled = self.__prepared_statements[name]
+                values = tuple(parameters.get(key, compiled.params[key]) for key in compiled.positiontup)
+                placeholders = ", ".join(["%s"] * len(values))
+                result = connection.exec_driver_sql(f"EXECUTE {name}({placeholders})", values)
+            else:
+                result = connection.execute(PREPARED_STATEMENTS[name], parameters)
+            row = result.first()
+
+        return None if row is None else row._asdict()
+
+    def get_replication_lag(self) -> dict[str, Optional[float]]:
+        """
+        Reports the replication lag of every read replica, e.g. to check that reads are consistent after an import.
+
+        Returns:
+            dict[str, Optional[float]]: Lag in seconds by replica host, None for unreachable replicas.
+        """
+        return self.router.replication_lags()
+
+    def __current_snapshot(self) -> Optional[PositionSnapshot]:
+        """
+        Maps the position snapshot on first use, and remaps it whenever a new one was swapped in.
+        The new mapping is built before being swapped in under a lock, and the previous one is never closed here:
+        requests still reading it keep it alive, and garbage collection releases it once they are done.
+
+        Returns:
+            Optional[PositionSnapshot]: The mapped snapshot, or None if it is not configured or not built yet.
+        """
+        if self.snapshot_path is None:
+            return None
+        snapshot = self.__snapshot
+        if snapshot is not None and not snapshot.is_outdated():
+            return snapshot
+
+        with self.__snapshot_lock:
+            snapshot = self.__snapshot
+            if (snapshot is None or snapshot.is_outdated()) and os.path.exists(self.snapshot_path):
+                try:
+                    snapshot = PositionSnapshot(self.snapshot_path)
+                    self.__snapshot = snapshot
+                    self.logger.info(f"Mapped position snapshot {self.snapshot_path}")
+                except PositionSnapshot.InvalidSnapshotFile as ex:
+                    self.logger.warning(str(ex))
+        return snapshot
 
     def get_last_known_location(self, object_id: str, timestamp_as_str: str) -> dict:
         """
@@ -46,18 +231,19 @@ class RdbmsDataFetcher:
             NoResultFound: If no position data is found for the given object_id and timestamp.
             To be used while outputting Error 404 in Flask
         """
-        session = Session(bind=self.engine)
+        snapshot = self.__current_snapshot()
+        if snapshot is not None:
+            last_known_position = snapshot.get_last_known_location(object_id, datetime.fromisoformat(timestamp_as_str))
+            if last_known_position is not None:
+                return last_known_position
+
         self.logger.info("Fetching last known location")
-        last_known_position = (
-            session.query(SatelliteLocations)
-            .filter(SatelliteLocations.object_id == object_id)
-            .filter(SatelliteLocations.creation_date <= timestamp_as_str)
-            .order_by(SatelliteLocations.creation_date.desc())
-            .first()
+        last_known_position = self.__fetch_first_row(
+            "last_known_location", {"object_id": object_id, "timestamp": timestamp_as_str}
         )
 
         if last_known_position is not None:
-            return last_known_position.to_dict()
+            return last_known_position
         else:
             raise NoResultFound("No position found for the given object_id and timestamp")
 
@@ -78,18 +264,35 @@ class RdbmsDataFetcher:
             NoResultFound: If no satellite is found close to the specified location at the given timestamp.
             To be used while outputting Error 404 in Flask
         """
-        session = Session(bind=self.engine)
-        self.logger.info("Fetching closest satellite")
-        point = ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)
+        snapshot = self.__current_snapshot()
+        if snapshot is not None:
+            closest_satellite = snapshot.get_closest_satellite(
+                datetime.fromisoformat(timestamp_as_str), latitude, longitude
+            )
+            if closest_satellite is not None:
+                return closest_satellite
 
-        closest_satellite = (
-            session.query(SatelliteLocations)
-            .filter(SatelliteLocations.creation_date == timestamp_as_str)
-            .order_by(ST_Distance(SatelliteLocations.location, point))
-            .first()
+        self.logger.info("Fetching closest satellite")
+        closest_satellite = self.__fetch_first_row(
+            "closest_satellite", {"timestamp": timestamp_as_str, "latitude": latitude, "longitude": longitude}
         )
 
         if closest_satellite is not None:
-            return closest_satellite.to_dict()
+            return closest_satellite
         else:
             raise NoResultFound("No position found for the given object_id and timestamp")
+
+
+def compile_prepared_statements(statements: dict[str, Select]) -> dict:
+    """
+    Compiles Core statements into Postgresql positional ($1, $2, ...) SQL, to be used in PREPARE.
+    Each compiled statement keeps the order of its parameters (positiontup) and their constant values (params).
+
+    Parameters:
+        statements (dict[str, Select]): Statements to compile, by prepared statement name.
+
+    Returns:
+        dict: The compiled statements, by prepared statement name.
+    """
+    dialect = postgresql.psycopg2.dialect(paramstyle="numeric_dollar")
+    return {name: statement.compile(dialect=dialect) for name, statement in statements.items()}
@@ -0,0 +1,221 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+# Replication state of a replica: whether it is replicating at all (a standalone instance used as a stand-in is not),
+# whether its WAL receiver is streaming from the primary, the position it replayed up to and when it last replayed.
+REPLICA_STATUS_QUERY = text("""
+    SELECT
+        pg_is_in_recovery(),
+        EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming'),
+        COALESCE(pg_last_wal_replay_lsn() >= CAST(:primary_lsn AS pg_lsn), FALSE),
+        COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    """)
+
+CURRENT_WAL_LSN_QUERY = text("SELECT pg_current_wal_lsn()::text")
+
+REPLAYED_WAL_LSN_QUERY = text("SELECT COALESCE(pg_last_wal_replay_lsn() >= CAST(:lsn AS pg_lsn), TRUE)")
+
+
+class ReplicaRouter:
+    """
+    Routes read-only connections to a set of read replicas with round-robin load balancing,
+    falling back to the primary when no replica is healthy.
+
+    Replicas are health checked every health_check_interval by a background thread (see start_health_checks),
+    so requests never wait on a health check. Their lag is measured against the primary's current WAL position:
+    a replica that replayed it has no lag, otherwise its lag is the time since it last replayed a transaction.
+    Replicas that cannot be reached, whose WAL receiver is not streaming from the primary, that lag more than
+    max_replication_lag_seconds, or that were not checked yet, are skipped.
+
+    Attributes:
+        logger (Logger): A logging object for capturing the activities of the router.
+        primary_engine (Engine): A SQLAlchemy engine pointing to the primary.
+        replica_engines (list[Engine]): SQLAlchemy engines pointing to each read replica.
+        health_check_interval (float): Seconds between two health checks of the same replica.
+        max_replication_lag_seconds (Optional[float]): Maximum lag of a routed replica. Unbounded when None.
+
+    Methods:
+        connect: Context manager yielding a connection to a healthy replica, or to the primary.
+        start_health_checks: Starts the background thread health checking the replicas.
+        check_replicas: Health checks every replica once.
+        replication_lags: Replication lag of each replica, in seconds.
+        fetch_primary_wal_lsn: Current write-ahead log position of the primary.
+        wait_for_replication: Waits until every healthy replica replayed up to a write-ahead log position.
+    """
+
+    def __init__(
+        self,
+        logger,
+        primary_engine: Engine,
+        replica_engines: list[Engine],
+        health_check_interval: float = 10.0,
+        max_replication_lag_seconds: Optional[float] = None,
+    ) -> None:
+        self.logger = logger
+        self.primary_engine = primary_engine
+        self.replica_engines = replica_engines
+        self.health_check_interval = health_check_interval
+        self.max_replication_lag_seconds = max_replication_lag_seconds
+
+        self.__lock = threading.Lock()
+        self.__next_replica = 0
+        self.__lags: list[Optional[float]] = [None] * len(replica_engines)
+        self.__health_check_thread = None
+        self.__stop_health_checks = threading.Event()
+
+    @contextmanager
+    def connect(self) -> Iterator[Connection]:
+        """
+        Checks out a connection from the next healthy replica, or from the primary if none is available.
+        Only the checkout falls back; errors raised while running queries propagate to the caller.
+
+        Yields:
+            Connection: A SQLAlchemy connection, closed when leaving the context.
+        """
+        connection = self.__checkout()
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def __checkout(self) -> Connection:
+        with self.__lock:
+            start = self.__next_replica
+            self.__next_replica = (self.__next_replica + 1) % max(len(self.replica_engines), 1)
+
+        for offset in range(len(self.replica_engines)):
+            index = (start + offset) % len(self.replica_engines)
+            if not self.__is_healthy(index):
+                continue
+            try:
+                return self.replica_engines[index].connect()
+            except DBAPIError as ex:
+                self.__mark_unhealthy(index, ex)
+
+        if self.replica_engines:
+            self.logger.warning("No healthy read replica available, falling back to the primary.")
+        return self.primary_engine.connect()
+
+    def __is_healthy(self, index: int) -> bool:
+        lag = self.__lags[index]
+        if lag is None:
+            return False
+        return self.max_replication_lag_seconds is None or lag <= self.max_replication_lag_seconds
+
+    def start_health_checks(self) -> None:
+        """
+        Starts the daemon thread health checking every replica right away, then every health_check_interval.
+        Until the first check completes, reads go to the primary.
+        """
+        if not self.replica_engines or self.__health_check_thread is not None:
+            return
+        self.__health_check_thread = threading.Thread(
+            target=self.__run_health_checks, name="ReplicaRouterHealthChecks", daemon=True
+        )
+        self.__health_check_thread.start()
+
+    def stop_health_checks(self) -> None:
+        self.__stop_health_checks.set()
+
+    def __run_health_checks(self) -> None:
+        while True:
+            try:
+                self.check_replicas()
+            except Exception as ex:
+                self.logger.warning(f"Read replica health check failed: {ex}")
+            if self.__stop_health_checks.wait(self.health_check_interval):
+                return
+
+    def check_replicas(self) -> None:
+        """
+        Health checks every replica once, measuring its lag against the primary's current WAL position.
+        If the primary cannot be reached, replicas are only checked for reachability and streaming.
+        """
+        try:
+            primary_lsn = self.fetch_primary_wal_lsn()
+        except DBAPIError as ex:
+            self.logger.warning(f"Could not fetch the primary WAL position: {ex}")
+            primary_lsn = None
+
+        for index in range(len(self.replica_engines)):
+            self.__check_replica(index, primary_lsn)
+
+    def __check_replica(self, index: int, primary_lsn: Optional[str]) -> None:
+        try:
+            with self.replica_engines[index].connect() as connection:
+                in_recovery, streaming, caught_up, seconds_since_replay = connection.execute(
+                    REPLICA_STATUS_QUERY, {"primary_lsn": primary_lsn}
+                ).one()
+        except DBAPIError as ex:
+            self.__mark_unhealthy(index, ex)
+            return
+
+        if not in_recovery:
+            self.__lags[index] = 0.0
+        elif not streaming:
+            self.__mark_unhealthy(index, "WAL receiver is not streaming from the primary")
+        else:
+            self.__lags[index] = 0.0 if caught_up else float(seconds_since_replay)
+
+    def __mark_unhealthy(self, index: int, reason) -> None:
+        self.logger.warning(f"Read replica {self.replica_engines[index].url.host} is unhealthy: {reason}")
+        self.__lags[index] = None
+
+    def replication_lags(self) -> dict[str, Optional[float]]:
+        """
+        Checks every replica and reports how far behind the primary it is.
+
+        Returns:
+            dict[str, Optional[float]]: Lag in seconds by replica host, None for unhealthy replicas.
+        """
+        self.check_replicas()
+        return {engine.url.host: self.__lags[index] for index, engine in enumerate(self.replica_engines)}
+
+    def fetch_primary_wal_lsn(self) -> str:
+        """
+        Fetches the primary's current write-ahead log position, e.g. right after an import committed.
+
+        Returns:
+            str: The write-ahead log position, as text.
+        """
+        with self.primary_engine.connect() as connection:
+            return connection.execute(CURRENT_WAL_LSN_QUERY).scalar()
+
+    def wait_for_replication(self, lsn: str, timeout: float = 60.0, poll_interval: float = 0.5) -> bool:
+        """
+        Waits until every reachable replica replayed the primary's write-ahead log up to lsn,
+        so that reads routed to replicas see everything written before it.
+
+        Parameters:
+            lsn (str): The write-ahead log position to wait for, see fetch_primary_wal_lsn.
+            timeout (float): Maximum number of seconds to wait.
+            poll_interval (float): Seconds between two checks.
+
+        Returns:
+            bool: True if every reachable replica caught up within the timeout. Otherwise, False.
+        """
+        pending = list(range(len(self.replica_engines)))
+        deadline = time.monotonic() + timeout
+        while pending:
+            for index in list(pending):
+                try:
+                    with self.replica_engines[index].connect() as connection:
+                        if connection.execute(REPLAYED_WAL_LSN_QUERY, {"lsn": lsn}).scalar():
+                            pending.remove(index)
+                except DBAPIError as ex:
+                    self.__mark_unhealthy(index, ex)
+                    pending.remove(index)
+
+            if pending and time.monotonic() >= deadline:
+                hosts = [self.replica_engines[index].url.host for index in pending]
+                self.logger.warning(f"Replicas {hosts} did not replay {lsn} within {timeout} seconds.")
+                return False
+            if pending:
+                time.sleep(poll_interval)
+        return True
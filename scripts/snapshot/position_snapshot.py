@@ -0,0 +1,385 @@
+import math
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models.database.starlink_positions import SatelliteLocations
+
+SNAPSHOT_MAGIC = b"STLKSNAP"
+SNAPSHOT_VERSION = 1
+# magic, version, reserved, number of epochs, number of rows, number of objects
+SNAPSHOT_HEADER = struct.Struct("=8sIIQQQ")
+
+# Ratio under which two great-circle distances may rank the other way round on the WGS84 spheroid used by
+# ST_Distance on geography. The spheroid's local radii stay within about 0.6% of the mean earth radius,
+# so a ratio above 1.02 is ranked the same by both metrics.
+CLOSEST_SATELLITE_MIN_DISTANCE_RATIO = 1.02
+
+UNIX_EPOCH = datetime(1970, 1, 1)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+def datetime_to_epoch_us(value: datetime) -> int:
+    """
+    Converts a naive (UTC) datetime into microseconds since the unix epoch.
+    """
+    return (value - UNIX_EPOCH) // ONE_MICROSECOND
+
+
+def epoch_us_to_datetime(value: int) -> datetime:
+    """
+    Converts microseconds since the unix epoch back into a naive (UTC) datetime.
+    """
+    return UNIX_EPOCH + timedelta(microseconds=value)
+
+
+def _pad_to_eight_bytes(file, written: int) -> int:
+    padding = -written % 8
+    file.write(b"\x00" * padding)
+    return written + padding
+
+
+class PositionSnapshotWriter:
+    """
+    Writes an immutable binary snapshot of the satellite_locations table, meant to be memory-mapped
+    read-only by every API worker so they all share the same pages.
+
+    File layout (native byte order, as the file is written and mapped on the same machine,
+    every section aligned to 8 bytes):
+        header: magic, version, number of epochs, number of rows and number of objects.
+        epochs (int64[n_epochs]): sorted distinct creation dates, as microseconds since the unix epoch.
+        epoch_offsets (int64[n_epochs + 1]): first row of each epoch. Rows are sorted by epoch.
+        row_objects (uint32[n_rows]): index of the row's object_id in the object dictionary.
+        row_latitudes, row_longitudes (float64[n_rows]): coordinates of each row, NaN when null.
+        object_rows (uint32[n_rows]): row indexes sorted by (object_id, epoch).
+        object_offsets (int64[n_objects + 1]): first entry in object_rows of each object.
+        name_offsets (int64[n_objects + 1]) and name blob: the sorted, utf-8 encoded object_id dictionary.
+
+    Attributes:
+        logger (Logger): A logging object used to log messages.
+
+    Methods:
+        build_from_engine: Reads the whole table through the engine and writes the snapshot.
+        write: Writes the snapshot from (object_id, creation_date, latitude, longitude) rows.
+    """
+
+    def __init__(self, logger) -> None:
+        self.logger = logger
+
+    def build_from_engine(self, engine, snapshot_path: str) -> None:
+        """
+        Builds the snapshot from the current contents of the satellite_locations table,
+        streaming the rows in creation date order straight into the snapshot arrays.
+
+        Parameters:
+            engine (Engine): A SQLAlchemy engine pointing to the database holding the table.
+            snapshot_path (str): Destination of the snapshot file.
+
+        Returns:
+            None
+        """
+        statement = select(
+            SatelliteLocations.object_id,
+            SatelliteLocations.creation_date,
+            SatelliteLocations.latitude,
+            SatelliteLocations.longitude,
+        ).order_by(SatelliteLocations.creation_date)
+
+        with Session(bind=engine) as session:
+            rows = session.execute(statement).yield_per(10000)
+            self.write(snapshot_path, rows, presorted=True)
+
+    def write(
+        self,
+        snapshot_path: str,
+        rows: Iterable[Tuple[str, datetime, Optional[float], Optional[float]]],
+        presorted: bool = False,
+    ) -> None:
+        """
+        Writes the snapshot to a temporary file next to snapshot_path and atomically swaps it in,
+        so workers either see the previous snapshot or the complete new one.
+
+        Parameters:
+            snapshot_path (str): Destination of the snapshot file.
+            rows (Iterable): (object_id, creation_date, latitude, longitude) tuples.
+            presorted (bool): Whether the rows already come sorted by creation date. They are then consumed
+                as a stream, without being held in memory; otherwise they are sorted first.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If presorted rows are not sorted by creation date.
+        """
+        if not presorted:
+            rows = sorted(rows, key=lambda row: row[1])
+
+        # Objects are numbered by first appearance while streaming, then renumbered in sorted order.
+        first_seen_indexes = {}
+        epochs = array("q")
+        epoch_offsets = array("q")
+        row_objects = array("I")
+        row_latitudes = array("d")
+        row_longitudes = array("d")
+        for row_index, (object_id, creation_date, latitude, longitude) in enumerate(rows):
+            epoch = datetime_to_epoch_us(creation_date)
+            if not epochs or epochs[-1] != epoch:
+                if epochs and epoch < epochs[-1]:
+                    raise ValueError("Snapshot rows are not sorted by creation date.")
+                epochs.append(epoch)
+                epoch_offsets.append(row_index)
+            row_objects.append(first_seen_indexes.setdefault(object_id, len(first_seen_indexes)))
+            row_latitudes.append(math.nan if latitude is None else latitude)
+            row_longitudes.append(math.nan if longitude is None else longitude)
+        n_rows = len(row_objects)
+        epoch_offsets.append(n_rows)
+
+        object_ids = sorted(first_seen_indexes)
+        sorted_indexes = array("I", [0] * len(object_ids))
+        for sorted_index, object_id in enumerate(object_ids):
+            sorted_indexes[first_seen_indexes[object_id]] = sorted_index
+        for row_index in range(n_rows):
+            row_objects[row_index] = sorted_indexes[row_objects[row_index]]
+
+        # Rows are already sorted by epoch, so a stable sort on the object keeps each object's rows chronological.
+        object_rows = array("I", sorted(range(n_rows), key=row_objects.__getitem__))
+        object_offsets = array("q", [0] * (len(object_ids) + 1))
+        for object_index in row_objects:
+            object_offsets[object_index + 1] += 1
+        for index in range(len(object_ids)):
+            object_offsets[index + 1] += object_offsets[index]
+
+        encoded_names = [object_id.encode("utf-8") for object_id in object_ids]
+        name_offsets = array("q", [0])
+        for name in encoded_names:
+            name_offsets.append(name_offsets[-1] + len(name))
+
+        directory = os.path.dirname(os.path.abspath(snapshot_path))
+        os.makedirs(directory, exist_ok=True)
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+        try:
+            with os.fdopen(file_descriptor, "wb") as snapshot_file:
+                written = snapshot_file.write(
+                    SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, len(epochs), n_rows, len(object_ids))
+                )
+                for section in (
+                    epochs,
+                    epoch_offsets,
+                    row_objects,
+                    row_latitudes,
+                    row_longitudes,
+                    object_rows,
+                    object_offsets,
+                    name_offsets,
+                ):
+                    written = _pad_to_eight_bytes(snapshot_file, written + snapshot_file.write(section.tobytes()))
+                snapshot_file.write(b"".join(encoded_names))
+                snapshot_file.flush()
+                os.fsync(snapshot_file.fileno())
+            os.chmod(temporary_path, 0o644)
+            os.replace(temporary_path, snapshot_path)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+
+        self.logger.info(
+            f"Wrote position snapshot {snapshot_path}: {n_rows} rows, "
+            f"{len(epochs)} epochs, {len(object_ids)} objects."
+        )
+
+
+class PositionSnapshot:
+    """
+    Read-only, memory-mapped view over a snapshot written by PositionSnapshotWriter.
+    Mapping is cheap and the pages are shared by every process mapping the same file.
+
+    Attributes:
+        snapshot_path (str): Path of the mapped snapshot file.
+
+    Methods:
+        is_outdated: Whether a new snapshot was swapped in at snapshot_path since this one was mapped.
+        get_last_known_location: Last recorded position of an object up to a timestamp.
+        get_closest_satellite: Nearest satellite to a point at an exact timestamp.
+        close: Releases the mapping.
+    """
+
+    class InvalidSnapshotFile(Exception):
+        def __init__(self, snapshot_path):
+            self.message = f"{snapshot_path} is not a valid position snapshot."
+            super().__init__(self.message)
+
+    def __init__(self, snapshot_path: str) -> None:
+        self.snapshot_path = snapshot_path
+        self.__mmap = None
+        self.__views = []
+        try:
+            with open(snapshot_path, "rb") as snapshot_file:
+                self.__file_stat = os.fstat(snapshot_file.fileno())
+                self.__mmap = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.__map_sections()
+        except (OSError, struct.error, TypeError, ValueError):
+            self.close()
+            raise PositionSnapshot.InvalidSnapshotFile(snapshot_path)
+
+    def __map_sections(self) -> None:
+        magic, version, _, n_epochs, n_rows, n_objects = SNAPSHOT_HEADER.unpack_from(self.__mmap, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError("Unexpected snapshot header.")
+
+        buffer = memoryview(self.__mmap)
+        self.__views.append(buffer)
+        position = SNAPSHOT_HEADER.size
+
+        def next_section(type_code: str, length: int) -> memoryview:
+            nonlocal position
+            size = struct.calcsize(type_code) * length
+            if position + size > len(buffer):
+                raise ValueError("Truncated snapshot section.")
+            view = buffer[position : position + size].cast(type_code)
+            self.__views.append(view)
+            position += size + (-size % 8)
+            return view
+
+        self.__epochs = next_section("q", n_epochs)
+        self.__epoch_offsets = next_section("q", n_epochs + 1)
+        self.__row_objects = next_section("I", n_rows)
+        self.__row_latitudes = next_section("d", n_rows)
+        self.__row_longitudes = next_section("d", n_rows)
+        self.__object_rows = next_section("I", n_rows)
+        self.__object_offsets = next_section("q", n_objects + 1)
+        name_offsets = next_section("q", n_objects + 1)
+
+        self.__object_ids = [
+            bytes(buffer[position + name_offsets[index] : position + name_offsets[index + 1]]).decode("utf-8")
+            for index in range(n_objects)
+        ]
+        self.__object_indexes = {object_id: index for index, object_id in enumerate(self.__object_ids)}
+
+    def is_outdated(self) -> bool:
+        """
+        Checks whether the file at snapshot_path was replaced since it was mapped.
+
+        Returns:
+            bool: True if a different file now lives at snapshot_path. Otherwise, False.
+        """
+        try:
+            current_stat = os.stat(self.snapshot_path)
+        except FileNotFoundError:
+            return False
+        return (current_stat.st_dev, current_stat.st_ino) != (self.__file_stat.st_dev, self.__file_stat.st_ino)
+
+    def close(self) -> None:
+        """
+        Releases every view over the mapping, then the mapping itself.
+        Only call it once no other thread can still be reading this snapshot;
+        otherwise drop the last reference and let garbage collection release it.
+        """
+        for view in reversed(self.__views):
+            view.release()
+        self.__views = []
+        if self.__mmap is not None:
+            self.__mmap.close()
+            self.__mmap = None
+
+    def get_last_known_location(self, object_id: str, timestamp: datetime) -> Optional[dict]:
+        """
+        Retrieves the last known location of a satellite up to (and including) the given timestamp.
+
+        Parameters:
+            object_id (str): The unique identifier of the satellite.
+            timestamp (datetime): The upper time limit up to which the position data is considered.
+
+        Returns:
+            Optional[dict]: The row of the last known position, or None when the snapshot has no match.
+        """
+        object_index = self.__object_indexes.get(object_id)
+        if object_index is None:
+            return None
+
+        # Rows are sorted by epoch first, so row indexes grow with the creation date within an object.
+        epoch_index = bisect_right(self.__epochs, datetime_to_epoch_us(timestamp))
+        first_later_row = self.__epoch_offsets[epoch_index]
+
+        start = self.__object_offsets[object_index]
+        end = self.__object_offsets[object_index + 1]
+        position = bisect_left(self.__object_rows, first_later_row, start, end)
+        if position == start:
+            return None
+
+        row = self.__object_rows[position - 1]
+        return self.__row_to_dict(row, self.__epochs[bisect_right(self.__epoch_offsets, row) - 1])
+
+    def get_closest_satellite(self, timestamp: datetime, latitude: float, longitude: float) -> Optional[dict]:
+        """
+        Identifies the closest satellite to a point at an exact timestamp.
+        Satellites are ranked by great-circle distance, while the database ranks them on the spheroid: the snapshot
+        only answers when the closest satellite is ahead by more than CLOSEST_SATELLITE_MIN_DISTANCE_RATIO,
+        so both rankings agree. Near-ties, and epochs without any coordinates, are left to the database.
+
+        Parameters:
+            timestamp (datetime): The exact time at which the proximity of satellites is evaluated.
+            latitude (float): The latitude of the point of interest.
+            longitude (float): The longitude of the point of interest.
+
+        Returns:
+            Optional[dict]: The row of the closest satellite, or None when the snapshot has no match
+                or cannot tell the closest satellite apart from the next one.
+        """
+        epoch = datetime_to_epoch_us(timestamp)
+        epoch_index = bisect_left(self.__epochs, epoch)
+        if epoch_index == len(self.__epochs) or self.__epochs[epoch_index] != epoch:
+            return None
+
+        start = self.__epoch_offsets[epoch_index]
+        end = self.__epoch_offsets[epoch_index + 1]
+
+        latitude_radians = math.radians(latitude)
+        longitude_radians = math.radians(longitude)
+        cos_latitude = math.cos(latitude_radians)
+
+        closest_row, closest_haversine, runner_up_haversine = None, math.inf, math.inf
+        for row in range(start, end):
+            row_latitude = math.radians(self.__row_latitudes[row])
+            row_longitude = math.radians(self.__row_longitudes[row])
+            # Haversine term; monotonic in the distance, so the asin is only taken for the two closest rows.
+            # Rows without coordinates give NaN, which never compares lower, as the database sorts NULLs last.
+            haversine = (
+                math.sin((row_latitude - latitude_radians) / 2) ** 2
+                + cos_latitude * math.cos(row_latitude) * math.sin((row_longitude - longitude_radians) / 2) ** 2
+            )
+            if haversine < closest_haversine:
+                closest_row, closest_haversine, runner_up_haversine = row, haversine, closest_haversine
+            elif haversine < runner_up_haversine:
+                runner_up_haversine = haversine
+
+        if closest_row is None:
+            return None
+        if runner_up_haversine < math.inf:
+            closest_angle = 2 * math.asin(math.sqrt(min(closest_haversine, 1.0)))
+            runner_up_angle = 2 * math.asin(math.sqrt(min(runner_up_haversine, 1.0)))
+            if runner_up_angle <= closest_angle * CLOSEST_SATELLITE_MIN_DISTANCE_RATIO:
+                return None
+
+        return self.__row_to_dict(closest_row, epoch)
+
+    def __row_to_dict(self, row: int, epoch: int) -> dict:
+        """
+        Builds the same dictionary as the database path: the response columns of the row.
+        """
+        latitude = self.__row_latitudes[row]
+        longitude = self.__row_longitudes[row]
+        return {
+            "object_id": self.__object_ids[self.__row_objects[row]],
+            "creation_date": epoch_us_to_datetime(epoch),
+            "latitude": None if math.isnan(latitude) else latitude,
+            "longitude": None if math.isnan(longitude) else longitude,
+        }
@@ -0,0 +1,94 @@
+import unittest
+import json
+import os
+import subprocess
+import sys
+from unittest.mock import patch
+
+# Startup may take at most this multiple of a bare flask_restx import, measured on the same machine.
+# Lazy startup stays close to 1x, while importing the database and Pydantic modules up front takes about 2.5x.
+STARTUP_BUDGET_FACTOR = 1.5
+PROBE_RUNS = 3
+
+MOCK_ENV_VARS = {
+    "POSTGRES_USER": "gabe",
+    "POSTGRES_PASSWORD": "gabe_pw",
+    "POSTGRES_PORT": "5432",
+    "POSTGRES_DB": "testdb",
+    "POSTGRES_HOST": "localhost",
+}
+
+STARTUP_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{startup}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+BASELINE_STARTUP = "import flask_restx"
+APP_STARTUP = "import app; app.create_app()"
+EAGER_APP_STARTUP = "import scripts.rdbms_fetcher.fetch_data, models.api.data_models; " + APP_STARTUP
+
+
+def build_repository_base_path():
+    return os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+
+def run_startup_probe(startup):
+    """
+    Runs the startup code in fresh interpreters, as a new worker would be, keeping the fastest run.
+    The database is configured but never reachable.
+    """
+    environment = {key: value for key, value in os.environ.items() if not key.startswith("POSTGRES_")}
+    environment.update(MOCK_ENV_VARS)
+    probes = []
+    for _ in range(PROBE_RUNS):
+        output = subprocess.run(
+            [sys.executable, "-c", STARTUP_PROBE.format(startup=startup)],
+            cwd=build_repository_base_path(),
+            env=environment,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        probes.append(json.loads(output.stdout.splitlines()[-1]))
+    return min(probes, key=lambda probe: probe["elapsed"])
+
+
+class TestAppStartup(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.startup_budget = STARTUP_BUDGET_FACTOR * run_startup_probe(BASELINE_STARTUP)["elapsed"]
+        cls.startup = run_startup_probe(APP_STARTUP)
+
+    def test_should_create_app_within_startup_budget(self):
+        self.assertLess(self.startup["elapsed"], self.startup_budget)
+
+    def test_should_exceed_startup_budget_with_eager_imports(self):
+        # Guards the budget itself: it must tell the lazy startup apart from an eager one.
+        self.assertGreater(run_startup_probe(EAGER_APP_STARTUP)["elapsed"], self.startup_budget)
+
+    def test_should_not_load_database_or_pydantic_modules_on_startup(self):
+        for module in ("sqlalchemy", "geoalchemy2", "pydantic", "scripts.rdbms_fetcher.fetch_data"):
+            self.assertNotIn(module, self.startup["modules"])
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_should_fail_fast_without_database_configuration(self):
+        from app import create_app
+        from scripts.configuration.database import DatabaseConfigurationHelper
+
+        with self.assertRaises(DatabaseConfigurationHelper.NecessaryParameterMissing):
+            create_app()
+
+    @patch.dict(os.environ, MOCK_ENV_VARS, clear=True)
+    def test_should_reject_invalid_payload_without_reaching_database(self):
+        from app import create_app
+
+        client = create_app().test_client()
+        response = client.post("/closest_satellite", json={"timestamp": "2021-01-26T06:26:10", "latitude": "north"})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,194 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from scripts.rdbms_fetcher.fetch_data import (
+    RdbmsDataFetcher,
+    PREPARED_STATEMENTS,
+    LAST_KNOWN_LOCATION_STATEMENT,
+    CLOSEST_SATELLITE_STATEMENT,
+    compile_prepared_statements,
+)
+from scripts.snapshot.position_snapshot import PositionSnapshotWriter
+from sqlalchemy.exc import NoResultFound
+
+
+class RdbmsDataFetcherTestCase(unittest.TestCase):
+    mock_env_vars = {
+        "POSTGRES_USER": "gabe",
+        "POSTGRES_PASSWORD": "gabe_pw",
+        "POSTGRES_PORT": "5432",
+        "POSTGRES_DB": "testdb",
+        "POSTGRES_HOST": "localhost",
+    }
+    row = {
+        "object_id": "2020-055AE",
+        "creation_date": datetime(2021, 1, 26, 6, 26, 10),
+        "latitude": 1.1,
+        "longitude": 10,
+    }
+
+    def setUp(self):
+        self.logger = MagicMock()
+        self.connection = MagicMock()
+        self.connection.execute.return_value.first.return_value._asdict.return_value = self.row
+        self.connection.exec_driver_sql.return_value.first.return_value._asdict.return_value = self.row
+        self.engine = MagicMock()
+        self.engine.connect.return_value = self.connection
+
+    def build_fetcher(self, use_prepared_statements, snapshot_path=None):
+        with patch.dict(os.environ, self.mock_env_vars, clear=True):
+            fetcher = RdbmsDataFetcher(
+                self.logger, snapshot_path=snapshot_path, use_prepared_statements=use_prepared_statements
+            )
+        with patch("scripts.rdbms_fetcher.fetch_data.create_engine", return_value=self.engine), patch(
+            "scripts.rdbms_fetcher.fetch_data.event"
+        ):
+            fetcher.engine
+        return fetcher
+
+
+class TestRdbmsDataFetcher(RdbmsDataFetcherTestCase):
+    def test_should_compile_positional_prepared_statements(self):
+        compiled = compile_prepared_statements(PREPARED_STATEMENTS)["last_known_location"]
+        self.assertIn("satellite_locations.object_id = $1", str(compiled))
+        self.assertEqual(list(compiled.positiontup), ["object_id", "timestamp", "param_1"])
+
+    def test_should_build_cacheable_statements(self):
+        for statement in (LAST_KNOWN_LOCATION_STATEMENT, CLOSEST_SATELLITE_STATEMENT):
+            self.assertIsNotNone(statement._generate_cache_key())
+
+    def test_should_run_prebuilt_core_statement_with_bound_parameters(self):
+        fetcher = self.build_fetcher(use_prepared_statements=False)
+        location = fetcher.get_last_known_location("2020-055AE", "2021-01-26T06:26:10")
+
+        self.assertEqual(location, self.row)
+        self.connection.execute.assert_called_once_with(
+            LAST_KNOWN_LOCATION_STATEMENT, {"object_id": "2020-055AE", "timestamp": "2021-01-26T06:26:10"}
+        )
+
+    def test_should_execute_prepared_statement_with_positional_parameters(self):
+        fetcher = self.build_fetcher(use_prepared_statements=True)
+        closest = fetcher.get_closest_satellite("2021-01-26T06:26:10", 0.3, 10)
+
+        self.assertEqual(closest, self.row)
+        self.connection.exec_driver_sql.assert_called_once_with(
+            "EXECUTE closest_satellite(%s, %s, %s, %s, %s)", ("2021-01-26T06:26:10", 10, 0.3, 4326, 1)
+        )
+
+    def test_should_create_engines_and_router_once_under_concurrent_first_requests(self):
+        env_vars = dict(self.mock_env_vars, POSTGRES_REPLICA_HOSTS="replica1,replica2")
+        with patch.dict(os.environ, env_vars, clear=True):
+            fetcher = RdbmsDataFetcher(self.logger, use_prepared_statements=False)
+
+        def slow_create_engine(*args, **kwargs):
+            # Widens the window in which unguarded lazy initialisations would overlap.
+            time.sleep(0.01)
+            return MagicMock()
+
+        barrier = threading.Barrier(8)
+        routers = []
+
+        def first_request():
+            barrier.wait()
+            routers.append(fetcher.router)
+
+        with patch(
+            "scripts.rdbms_fetcher.fetch_data.create_engine", side_effect=slow_create_engine
+        ) as mock_create_engine, patch("scripts.rdbms_fetcher.fetch_data.ReplicaRouter") as mock_router:
+            threads = [threading.Thread(target=first_request) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(mock_create_engine.call_count, 3)
+        self.assertEqual(mock_router.call_count, 1)
+        mock_router.return_value.start_health_checks.assert_called_once()
+        self.assertEqual(routers, [mock_router.return_value] * 8)
+
+    def test_should_raise_when_no_row_found(self):
+        fetcher = self.build_fetcher(use_prepared_statements=False)
+        self.connection.execute.return_value.first.return_value = None
+        with self.assertRaises(NoResultFound):
+            fetcher.get_closest_satellite("2021-01-26T06:26:10", 0.3, 10)
+
+
+class TestRdbmsDataFetcherSnapshot(RdbmsDataFetcherTestCase):
+    snapshot_rows = [
+        ("2019-029J", datetime(2021, 1, 26, 6, 26, 10), 1.5, 10.0),
+        ("2019-029J", datetime(2021, 1, 26, 7, 26, 10), -20.0, 40.0),
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.snapshot_path = os.path.join(self.temporary_directory.name, "positions.snapshot")
+        self.writer = PositionSnapshotWriter(self.logger)
+        self.writer.write(self.snapshot_path, self.snapshot_rows)
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def test_should_answer_from_snapshot_before_database(self):
+        fetcher = self.build_fetcher(use_prepared_statements=False, snapshot_path=self.snapshot_path)
+        location = fetcher.get_last_known_location("2019-029J", "2021-01-26T08:00:00")
+
+        self.assertEqual(location["creation_date"], datetime(2021, 1, 26, 7, 26, 10))
+        self.connection.execute.assert_not_called()
+
+    def test_should_fall_back_to_database_on_snapshot_miss(self):
+        fetcher = self.build_fetcher(use_prepared_statements=False, snapshot_path=self.snapshot_path)
+        location = fetcher.get_last_known_location("2020-055AE", "2021-01-26T08:00:00")
+
+        self.assertEqual(location, self.row)
+        self.connection.execute.assert_called_once()
+
+    def test_should_fall_back_to_database_on_invalid_snapshot(self):
+        open(self.snapshot_path, "wb").close()
+        fetcher = self.build_fetcher(use_prepared_statements=False, snapshot_path=self.snapshot_path)
+
+        self.assertEqual(fetcher.get_last_known_location("2019-029J", "2021-01-26T08:00:00"), self.row)
+        self.logger.getChild.return_value.warning.assert_called()
+
+    def test_should_remap_swapped_snapshot(self):
+        fetcher = self.build_fetcher(use_prepared_statements=False, snapshot_path=self.snapshot_path)
+        fetcher.get_last_known_location("2019-029J", "2021-01-26T08:00:00")
+
+        self.writer.write(self.snapshot_path, [("2020-055AE", datetime(2021, 1, 26, 6, 26, 10), 0.4, 10.2)])
+        closest = fetcher.get_closest_satellite("2021-01-26T06:26:10", 0.3, 10)
+
+        self.assertEqual((closest["object_id"], closest["latitude"]), ("2020-055AE", 0.4))
+        self.connection.execute.assert_not_called()
+
+    def test_should_keep_serving_reads_while_snapshot_is_swapped(self):
+        fetcher = self.build_fetcher(use_prepared_statements=False, snapshot_path=self.snapshot_path)
+        errors = []
+        stop = threading.Event()
+
+        def read_positions():
+            while not stop.is_set():
+                try:
+                    fetcher.get_last_known_location("2019-029J", "2021-01-26T08:00:00")
+                    fetcher.get_closest_satellite("2021-01-26T06:26:10", 0.3, 10)
+                except Exception as ex:
+                    errors.append(ex)
+
+        readers = [threading.Thread(target=read_positions) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        for _ in range(50):
+            self.writer.write(self.snapshot_path, self.snapshot_rows)
+        stop.set()
+        for reader in readers:
+            reader.join()
+
+        self.assertEqual(errors, [])
+        self.connection.execute.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
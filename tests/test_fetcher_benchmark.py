@@ -0,0 +1,25 @@
+import unittest
+import os
+from unittest.mock import patch
+from benchmarks.fetcher_benchmark import MOCK_DBAPI_ROW, main
+
+
+class TestFetcherBenchmark(unittest.TestCase):
+    @patch.dict(os.environ, {}, clear=True)
+    def test_should_run_every_path_without_database(self):
+        # main raises if the ORM, Core and prepared statement paths return different rows.
+        timings = main(
+            MOCK_DBAPI_ROW["object_id"],
+            MOCK_DBAPI_ROW["creation_date"].isoformat(),
+            MOCK_DBAPI_ROW["latitude"],
+            MOCK_DBAPI_ROW["longitude"],
+            iterations=1,
+            mock_dbapi=True,
+        )
+
+        for query in ("last_known_location", "closest_satellite"):
+            self.assertEqual(set(timings[query]), {"orm", "core", "prepared"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,9 +2,13 @@ import unittest
 from unittest.mock import patch, MagicMock, mock_open
 import json
 import os
-from scripts.importer.import_data import JsonToRdbmsDataImporter, SatelliteData, Base
+import tempfile
+from scripts.importer.import_data import JsonToRdbmsDataImporter, Base
+from scripts.importer.deduplication import DeduplicationWindow
 from models.database.starlink_positions import SatelliteLocations
+from models.json_input.satellite_position import SatelliteData
 from sqlalchemy import Column, String, Float, Boolean, DateTime, PrimaryKeyConstraint
+from sqlalchemy.exc import IntegrityError, OperationalError
 from pydantic import BaseModel
 
 
@@ -30,13 +34,16 @@ class TestJsonToRdbmsDataImporter(unittest.TestCase):
         self.mock_logger = MagicMock()
         self.mock_engine = MagicMock()
         self.batch_size = 5
-        self.data_importer = JsonToRdbmsDataImporter(self.mock_logger, self.mock_engine, self.batch_size)
+        # Model instantiation is mocked, so every record would share the same key: batching only, no deduplication.
+        self.data_importer = JsonToRdbmsDataImporter(
+            self.mock_logger, self.mock_engine, self.batch_size, deduplication_window_size=0
+        )
 
     @patch("scripts.importer.import_data.Session")
     @patch("scripts.importer.import_data.JsonToRdbmsDataImporter._JsonToRdbmsDataImporter__insert_data_to_rdbms")
     @patch("scripts.importer.import_data.JsonToRdbmsDataImporter._JsonToRdbmsDataImporter__instantiate_model_object")
     def test_should_insert_small_json_data_into_table(self, mock_instantiate_model, mock_insert_method, mock_session):
-        self.data_importer.insert_json_data_into_table(
+        self.data_importer.import_json_data_into_table(
             f"{build_test_base_path()}/fixtures/valid_data.json", MockTable, MockModel
         )
 
@@ -48,7 +55,7 @@ class TestJsonToRdbmsDataImporter(unittest.TestCase):
     @patch("scripts.importer.import_data.JsonToRdbmsDataImporter._JsonToRdbmsDataImporter__insert_data_to_rdbms")
     @patch("scripts.importer.import_data.JsonToRdbmsDataImporter._JsonToRdbmsDataImporter__instantiate_model_object")
     def test_should_insert_batched_data_into_table(self, mock_instantiate_model, mock_insert_method, mock_session):
-        self.data_importer.insert_json_data_into_table(
+        self.data_importer.import_json_data_into_table(
             f"{build_test_base_path()}/fixtures/longer_valid_data.json", MockTable, MockModel
         )
 
@@ -58,5 +65,230 @@ class TestJsonToRdbmsDataImporter(unittest.TestCase):
         self.assertEqual(mock_instantiate_model.call_count, 18)
 
 
+class TestImportPrePass(unittest.TestCase):
+    def setUp(self):
+        self.mock_logger = MagicMock()
+        self.mock_engine = MagicMock()
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.data_file_path = os.path.join(self.temporary_directory.name, "data.json")
+        self.quarantine_file_path = f"{self.data_file_path}.quarantine.jsonl"
+        self.data_importer = JsonToRdbmsDataImporter(self.mock_logger, self.mock_engine, batch_size=5)
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def write_data_file(self, elements):
+        with open(self.data_file_path, "w") as data_file:
+            json.dump(elements, data_file)
+
+    def build_satellite_element(self, object_id, creation_date, latitude=1.5, longitude=10.0):
+        return {
+            "spaceTrack": {"OBJECT_ID": object_id, "CREATION_DATE": creation_date},
+            "latitude": latitude,
+            "longitude": longitude,
+        }
+
+    def inserted_rows(self, mock_insert_method):
+        return [row for call in mock_insert_method.call_args_list for row in call.args[1]]
+
+    def read_quarantine_file(self):
+        with open(self.quarantine_file_path) as quarantine_file:
+            return [json.loads(line) for line in quarantine_file]
+
+    @patch("scripts.importer.import_data.Session")
+    @patch(
+        "scripts.importer.import_data.JsonToRdbmsDataImporter._JsonToRdbmsDataImporter__insert_data_to_rdbms",
+        side_effect=lambda table, values: len(values),
+    )
+    def test_should_drop_duplicates_before_insertion(self, mock_insert_method, mock_session):
+        self.write_data_file(
+            [
+                {"id": 48, "name": "v0.9"},
+                {"id": 62, "name": "2019-029J"},
+                {"id": 48, "name": "v0.9"},
+            ]
+        )
+        import_counts = self.data_importer.import_json_data_into_table(self.data_file_path, MockTable, MockModel)
+
+        self.assertEqual([row["id"] for row in self.inserted_rows(mock_insert_method)], [48, 62])
+        self.assertEqual(import_counts["duplicate_records"], 1)
+        self.assertEqual(import_counts["inserted_records"], 2)
+
+    @patch("scripts.importer.import_data.Session")
+    @patch("scripts.importer.import_data.JsonToRdbmsDataImporter._JsonToRdbmsDataImporter__insert_data_to_rdbms")
+    @patch(
+        "scripts.importer.import_data.JsonToRdbmsDataImporter._JsonToRdbmsDataImporter__instantiate_model_object",
+        side_effect=lambda model, element: model.model_validate(element),
+    )
+    def test_should_skip_validation_of_raw_duplicates(self, mock_instantiate_model, mock_insert_method, mock_session):
+        self.write_data_file(
+            [
+                self.build_satellite_element("2019-029J", "2021-01-26T06:26:10"),
+                self.build_satellite_element("2019-029J", "2021-01-26T06:26:10"),
+                self.build_satellite_element("2019-029J", "2021-01-26T07:26:10"),
+            ]
+        )
+        import_counts = self.data_importer.import_json_data_into_table(
+            self.data_file_path,
+            SatelliteLocations,
+            SatelliteData,
+            deduplication_key=SatelliteData.primary_key_from_element,
+        )
+
+        self.assertEqual(mock_instantiate_model.call_count, 2)
+        self.assertEqual(len(self.inserted_rows(mock_insert_method)), 2)
+        self.assertEqual(import_counts["duplicate_records"], 1)
+
+    @patch("scripts.importer.import_data.Session")
+    @patch("scripts.importer.import_data.JsonToRdbmsDataImporter._JsonToRdbmsDataImporter__insert_data_to_rdbms")
+    def test_should_quarantine_invalid_records_and_keep_importing(self, mock_insert_method, mock_session):
+        self.write_data_file(
+            [
+                self.build_satellite_element("2019-029J", "2021-01-26T06:26:10", latitude=123.4),
+                self.build_satellite_element("2020-055AE", "2021-01-26T06:26:10"),
+                {"latitude": 1.0},
+            ]
+        )
+        import_counts = self.data_importer.import_json_data_into_table(
+            self.data_file_path,
+            SatelliteLocations,
+            SatelliteData,
+            deduplication_key=SatelliteData.primary_key_from_element,
+        )
+
+        self.assertEqual([row["object_id"] for row in self.inserted_rows(mock_insert_method)], ["2020-055AE"])
+        self.assertEqual(import_counts["rejected_records"], 2)
+
+        quarantined = self.read_quarantine_file()
+        self.assertEqual(quarantined[0]["record"]["latitude"], 123.4)
+        self.assertIn("Latitude must be between -90 and 90", quarantined[0]["reason"])
+        self.assertEqual(quarantined[1]["record"], {"latitude": 1.0})
+
+    @patch("scripts.importer.import_data.Session")
+    @patch("scripts.importer.import_data.JsonToRdbmsDataImporter._JsonToRdbmsDataImporter__insert_data_to_rdbms")
+    def test_should_quarantine_records_with_invalid_creation_date(self, mock_insert_method, mock_session):
+        self.write_data_file(
+            [
+                self.build_satellite_element("2019-029J", "not-a-date"),
+                self.build_satellite_element("2019-029K", "2021-01-26"),
+                self.build_satellite_element("2019-029L", "2021-01-26T06:26:10+05:00"),
+                self.build_satellite_element("2020-055AE", "2021-01-26T06:26:10"),
+            ]
+        )
+        import_counts = self.data_importer.import_json_data_into_table(
+            self.data_file_path,
+            SatelliteLocations,
+            SatelliteData,
+            deduplication_key=SatelliteData.primary_key_from_element,
+        )
+
+        self.assertEqual([row["object_id"] for row in self.inserted_rows(mock_insert_method)], ["2020-055AE"])
+        self.assertEqual(import_counts["rejected_records"], 3)
+        for quarantined in self.read_quarantine_file():
+            self.assertIn("Creation date must be in ISO format", quarantined["reason"])
+
+    @patch("scripts.importer.import_data.Session")
+    @patch("scripts.importer.import_data.JsonToRdbmsDataImporter._JsonToRdbmsDataImporter__insert_data_to_rdbms")
+    def test_should_quarantine_records_with_non_scalar_key(self, mock_insert_method, mock_session):
+        self.write_data_file(
+            [
+                self.build_satellite_element(["2019-029J"], "2021-01-26T06:26:10"),
+                self.build_satellite_element("2020-055AE", {"date": "2021-01-26T06:26:10"}),
+                self.build_satellite_element("2020-055AE", "2021-01-26T06:26:10"),
+            ]
+        )
+        import_counts = self.data_importer.import_json_data_into_table(
+            self.data_file_path,
+            SatelliteLocations,
+            SatelliteData,
+            deduplication_key=SatelliteData.primary_key_from_element,
+        )
+
+        self.assertEqual([row["object_id"] for row in self.inserted_rows(mock_insert_method)], ["2020-055AE"])
+        self.assertEqual(import_counts["rejected_records"], 2)
+
+    @patch("scripts.importer.import_data.JsonToRdbmsDataImporter._JsonToRdbmsDataImporter__insert_data_to_rdbms")
+    def test_should_retry_rejected_batch_row_by_row(self, mock_insert_method):
+        def insert_unless_rejected(table, values):
+            if any(row["id"] == 62 for row in values):
+                raise IntegrityError("INSERT", {}, Exception("violates check constraint"))
+            return len(values)
+
+        mock_insert_method.side_effect = insert_unless_rejected
+        self.data_importer.session = MagicMock()
+        self.write_data_file([{"id": 48, "name": "v0.9"}, {"id": 62, "name": "2019-029J"}, {"id": 75, "name": "v1.0"}])
+        import_counts = self.data_importer.import_json_data_into_table(self.data_file_path, MockTable, MockModel)
+
+        self.assertEqual(mock_insert_method.call_count, 4)
+        self.assertEqual(self.data_importer.session.rollback.call_count, 2)
+        self.assertEqual(import_counts["inserted_records"], 2)
+        self.assertEqual(import_counts["rejected_records"], 1)
+
+        quarantined = self.read_quarantine_file()
+        self.assertEqual(quarantined[0]["record"], {"id": 62, "name": "2019-029J"})
+        self.assertIn("violates check constraint", quarantined[0]["reason"])
+
+    @patch("scripts.importer.import_data.JsonToRdbmsDataImporter._JsonToRdbmsDataImporter__insert_data_to_rdbms")
+    def test_should_abort_import_on_connection_error(self, mock_insert_method):
+        mock_insert_method.side_effect = OperationalError(
+            "INSERT", {}, Exception("server closed the connection unexpectedly")
+        )
+        self.data_importer.session = MagicMock()
+        self.write_data_file([{"id": 48, "name": "v0.9"}, {"id": 62, "name": "2019-029J"}])
+
+        with self.assertRaises(OperationalError):
+            self.data_importer.import_json_data_into_table(self.data_file_path, MockTable, MockModel)
+        self.assertEqual(mock_insert_method.call_count, 1)
+        self.assertFalse(os.path.exists(self.quarantine_file_path))
+
+    def test_should_count_rows_written_by_the_database(self):
+        # ON CONFLICT DO NOTHING skipped one of the two rows sent.
+        self.data_importer.session = MagicMock()
+        self.data_importer.session.execute.return_value.rowcount = 1
+        self.write_data_file([{"id": 48, "name": "v0.9"}, {"id": 62, "name": "2019-029J"}])
+        import_counts = self.data_importer.import_json_data_into_table(self.data_file_path, MockTable, MockModel)
+
+        self.assertEqual(import_counts["inserted_records"], 1)
+
+    @patch("scripts.importer.import_data.Session")
+    @patch("scripts.importer.import_data.JsonToRdbmsDataImporter._JsonToRdbmsDataImporter__insert_data_to_rdbms")
+    def test_should_not_create_quarantine_file_without_rejects(self, mock_insert_method, mock_session):
+        self.write_data_file([{"id": 48, "name": "v0.9"}])
+        self.data_importer.import_json_data_into_table(self.data_file_path, MockTable, MockModel)
+        self.assertFalse(os.path.exists(self.quarantine_file_path))
+
+    @patch("scripts.importer.import_data.Session")
+    @patch("scripts.importer.import_data.JsonToRdbmsDataImporter._JsonToRdbmsDataImporter__insert_data_to_rdbms")
+    def test_should_remove_quarantine_file_of_previous_run(self, mock_insert_method, mock_session):
+        with open(self.quarantine_file_path, "w") as quarantine_file:
+            quarantine_file.write('{"reason": "stale", "record": {}}\n')
+        self.write_data_file([{"id": 48, "name": "v0.9"}])
+        self.data_importer.import_json_data_into_table(self.data_file_path, MockTable, MockModel)
+        self.assertFalse(os.path.exists(self.quarantine_file_path))
+
+    def test_should_refuse_to_import_through_read_replica(self):
+        connection = self.mock_engine.connect.return_value.__enter__.return_value
+        connection.execute.return_value.scalar.return_value = True
+        with self.assertRaises(JsonToRdbmsDataImporter.ReadReplicaEngine):
+            self.data_importer.import_json_data_into_table(self.data_file_path, MockTable, MockModel)
+
+
+class TestDeduplicationWindow(unittest.TestCase):
+    def test_should_forget_oldest_keys_when_full(self):
+        window = DeduplicationWindow(max_keys=2)
+        for key in ("a", "b", "c"):
+            window.add(key)
+
+        self.assertNotIn("a", window)
+        self.assertIn("b", window)
+        self.assertIn("c", window)
+        self.assertEqual(len(window), 2)
+
+    def test_should_hold_nothing_when_disabled(self):
+        window = DeduplicationWindow(max_keys=0)
+        window.add("a")
+        self.assertNotIn("a", window)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+from unittest.mock import MagicMock
+import os
+import tempfile
+from datetime import datetime
+from scripts.snapshot.position_snapshot import PositionSnapshotWriter, PositionSnapshot
+
+
+class TestPositionSnapshot(unittest.TestCase):
+    rows = [
+        ("2019-029J", datetime(2021, 1, 26, 6, 26, 10), 1.5, 10.0),
+        ("2020-055AE", datetime(2021, 1, 26, 6, 26, 10), 0.4, 10.2),
+        ("v0.9", datetime(2021, 1, 26, 6, 26, 10), None, None),
+        ("2019-029J", datetime(2021, 1, 26, 7, 26, 10), -20.0, 40.0),
+        ("2020-055AE", datetime(2021, 1, 26, 8, 26, 10), 45.0, -100.0),
+        ("2019-029J", datetime(2021, 1, 26, 9, 26, 10), 10.0, 10.0),
+        ("2020-055AE", datetime(2021, 1, 26, 9, 26, 10), 10.05, 10.0),
+        ("v0.9", datetime(2021, 1, 26, 10, 26, 10), None, None),
+    ]
+
+    def setUp(self):
+        self.logger = MagicMock()
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.snapshot_path = os.path.join(self.temporary_directory.name, "positions.snapshot")
+        PositionSnapshotWriter(self.logger).write(self.snapshot_path, self.rows)
+        self.snapshot = PositionSnapshot(self.snapshot_path)
+
+    def tearDown(self):
+        self.snapshot.close()
+        self.temporary_directory.cleanup()
+
+    def test_should_return_last_known_location_up_to_timestamp(self):
+        location = self.snapshot.get_last_known_location("2019-029J", datetime(2021, 1, 26, 8, 0, 0))
+        self.assertEqual(location["creation_date"], datetime(2021, 1, 26, 7, 26, 10))
+        self.assertEqual((location["latitude"], location["longitude"]), (-20.0, 40.0))
+
+    def test_should_include_exact_timestamp_in_last_known_location(self):
+        location = self.snapshot.get_last_known_location("2020-055AE", datetime(2021, 1, 26, 6, 26, 10))
+        self.assertEqual(location["creation_date"], datetime(2021, 1, 26, 6, 26, 10))
+        self.assertEqual(location["latitude"], 0.4)
+
+    def test_should_miss_last_known_location_before_first_record_or_unknown_object(self):
+        self.assertIsNone(self.snapshot.get_last_known_location("2019-029J", datetime(2021, 1, 1)))
+        self.assertIsNone(self.snapshot.get_last_known_location("unknown", datetime(2022, 1, 1)))
+
+    def test_should_keep_null_coordinates(self):
+        location = self.snapshot.get_last_known_location("v0.9", datetime(2022, 1, 1))
+        self.assertIsNone(location["latitude"])
+        # Same keys as the database path, which only reads the response columns.
+        self.assertEqual(set(location), {"object_id", "creation_date", "latitude", "longitude"})
+
+    def test_should_return_closest_satellite_at_exact_timestamp(self):
+        closest = self.snapshot.get_closest_satellite(datetime(2021, 1, 26, 6, 26, 10), 0.3, 10)
+        self.assertEqual(closest["object_id"], "2020-055AE")
+
+        closest = self.snapshot.get_closest_satellite(datetime(2021, 1, 26, 6, 26, 10), 2, 10)
+        self.assertEqual(closest["object_id"], "2019-029J")
+
+    def test_should_leave_near_ties_to_the_database(self):
+        # 2020-055AE is closer on the sphere, but by less than the spheroid could reorder.
+        self.assertIsNone(self.snapshot.get_closest_satellite(datetime(2021, 1, 26, 9, 26, 10), 10.0252, 10.0))
+        closest = self.snapshot.get_closest_satellite(datetime(2021, 1, 26, 9, 26, 10), 10.5, 10.0)
+        self.assertEqual(closest["object_id"], "2020-055AE")
+
+    def test_should_leave_epoch_without_coordinates_to_the_database(self):
+        self.assertIsNone(self.snapshot.get_closest_satellite(datetime(2021, 1, 26, 10, 26, 10), 0, 0))
+
+    def test_should_write_presorted_rows_from_a_stream(self):
+        presorted_path = os.path.join(self.temporary_directory.name, "presorted.snapshot")
+        sorted_rows = sorted(self.rows, key=lambda row: row[1])
+        PositionSnapshotWriter(self.logger).write(presorted_path, iter(sorted_rows), presorted=True)
+
+        with open(presorted_path, "rb") as presorted_file, open(self.snapshot_path, "rb") as snapshot_file:
+            self.assertEqual(presorted_file.read(), snapshot_file.read())
+
+    def test_should_reject_unsorted_presorted_rows(self):
+        presorted_path = os.path.join(self.temporary_directory.name, "presorted.snapshot")
+        with self.assertRaises(ValueError):
+            PositionSnapshotWriter(self.logger).write(presorted_path, reversed(self.rows), presorted=True)
+        self.assertEqual(os.listdir(self.temporary_directory.name), ["positions.snapshot"])
+
+    def test_should_miss_closest_satellite_when_timestamp_not_present(self):
+        self.assertIsNone(self.snapshot.get_closest_satellite(datetime(2021, 1, 26, 6, 26, 11), 0, 0))
+
+    def test_should_detect_atomically_swapped_snapshot(self):
+        self.assertFalse(self.snapshot.is_outdated())
+        PositionSnapshotWriter(self.logger).write(self.snapshot_path, self.rows[:1])
+        self.assertTrue(self.snapshot.is_outdated())
+
+        # The previous mapping stays readable after the swap.
+        self.assertIsNotNone(self.snapshot.get_last_known_location("v0.9", datetime(2022, 1, 1)))
+        swapped_snapshot = PositionSnapshot(self.snapshot_path)
+        self.assertIsNone(swapped_snapshot.get_last_known_location("v0.9", datetime(2022, 1, 1)))
+        swapped_snapshot.close()
+
+    def test_should_fail_on_invalid_snapshot_file(self):
+        invalid_path = os.path.join(self.temporary_directory.name, "invalid.snapshot")
+        with open(invalid_path, "wb") as invalid_file:
+            invalid_file.write(b"not a snapshot at all, just some bytes padding it out")
+        with self.assertRaises(PositionSnapshot.InvalidSnapshotFile):
+            PositionSnapshot(invalid_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+import time
+from unittest.mock import MagicMock
+from scripts.rdbms_fetcher.replica_router import ReplicaRouter
+from sqlalchemy.exc import OperationalError
+
+
+def build_mock_engine(host, lag=0.0, in_recovery=True, streaming=True):
+    engine = MagicMock()
+    engine.url.host = host
+    result = engine.connect.return_value.__enter__.return_value.execute.return_value
+    result.one.return_value = (in_recovery, streaming, lag == 0.0, lag)
+    result.scalar.return_value = "0/3000060"
+    return engine
+
+
+def build_unreachable_engine(host):
+    engine = MagicMock()
+    engine.url.host = host
+    engine.connect.side_effect = OperationalError("SELECT 1", {}, Exception("connection refused"))
+    return engine
+
+
+class TestReplicaRouter(unittest.TestCase):
+    def setUp(self):
+        self.logger = MagicMock()
+        self.primary = build_mock_engine("primary", in_recovery=False)
+
+    def checked_out_connections(self, router, n):
+        connections = []
+        for _ in range(n):
+            with router.connect() as connection:
+                connections.append(connection)
+        return connections
+
+    def test_should_use_primary_without_replicas(self):
+        router = ReplicaRouter(self.logger, self.primary, [])
+        with router.connect() as connection:
+            self.assertIs(connection, self.primary.connect.return_value)
+
+    def test_should_use_primary_until_replicas_are_checked(self):
+        replica = build_mock_engine("replica1")
+        router = ReplicaRouter(self.logger, self.primary, [replica])
+
+        with router.connect() as connection:
+            self.assertIs(connection, self.primary.connect.return_value)
+        replica.connect.assert_not_called()
+
+    def test_should_balance_reads_across_replicas(self):
+        replicas = [build_mock_engine("replica1"), build_mock_engine("replica2")]
+        router = ReplicaRouter(self.logger, self.primary, replicas)
+        router.check_replicas()
+
+        connections = self.checked_out_connections(router, 4)
+        replica_connections = [replica.connect.return_value for replica in replicas]
+        self.assertEqual(connections, replica_connections * 2)
+
+    def test_should_skip_unreachable_replica(self):
+        replicas = [build_unreachable_engine("replica1"), build_mock_engine("replica2")]
+        router = ReplicaRouter(self.logger, self.primary, replicas)
+        router.check_replicas()
+
+        connections = self.checked_out_connections(router, 3)
+        self.assertEqual(connections, [replicas[1].connect.return_value] * 3)
+
+    def test_should_fall_back_to_primary_when_no_replica_is_healthy(self):
+        replicas = [build_unreachable_engine("replica1"), build_mock_engine("replica2", lag=120.0)]
+        router = ReplicaRouter(self.logger, self.primary, replicas, max_replication_lag_seconds=5)
+        router.check_replicas()
+
+        with router.connect() as connection:
+            self.assertIs(connection, self.primary.connect.return_value)
+        self.logger.warning.assert_called()
+
+    def test_should_treat_replica_without_streaming_receiver_as_unhealthy(self):
+        replica = build_mock_engine("replica1", streaming=False)
+        router = ReplicaRouter(self.logger, self.primary, [replica])
+
+        self.assertEqual(router.replication_lags(), {"replica1": None})
+
+    def test_should_report_replication_lags(self):
+        replicas = [
+            build_unreachable_engine("replica1"),
+            build_mock_engine("replica2", lag=1.5),
+            build_mock_engine("standalone", lag=30.0, in_recovery=False),
+        ]
+        router = ReplicaRouter(self.logger, self.primary, replicas)
+
+        self.assertEqual(router.replication_lags(), {"replica1": None, "replica2": 1.5, "standalone": 0.0})
+
+    def test_should_check_replicas_in_background(self):
+        replica = build_mock_engine("replica1")
+        router = ReplicaRouter(self.logger, self.primary, [replica], health_check_interval=0.01)
+        router.start_health_checks()
+        try:
+            deadline = time.monotonic() + 5
+            while self.checked_out_connections(router, 1) != [replica.connect.return_value]:
+                self.assertLess(time.monotonic(), deadline)
+                time.sleep(0.01)
+        finally:
+            router.stop_health_checks()
+
+    def test_should_wait_for_replicas_to_replay_lsn(self):
+        replica = build_mock_engine("replica1")
+        replayed = replica.connect.return_value.__enter__.return_value.execute.return_value.scalar
+        replayed.side_effect = [False, True]
+        router = ReplicaRouter(self.logger, self.primary, [replica])
+
+        self.assertTrue(router.wait_for_replication("0/3000060", timeout=5, poll_interval=0))
+        self.assertEqual(replayed.call_count, 2)
+
+    def test_should_time_out_waiting_for_lagging_replica(self):
+        replica = build_mock_engine("replica1")
+        replica.connect.return_value.__enter__.return_value.execute.return_value.scalar.return_value = False
+        router = ReplicaRouter(self.logger, self.primary, [replica])
+
+        self.assertFalse(router.wait_for_replication("0/3000060", timeout=0, poll_interval=0))
+
+
+if __name__ == "__main__":
+    unittest.main()